@@ -0,0 +1,54 @@
+"""
+Laporan memori frame terolah: skema lama (teks object + float64) dibandingkan
+skema ringkas (kategori + rupiah int64 + TAHUN int16) pada data sintetis.
+
+Jalankan dari root repo:
+    python benchmarks/bench_memory.py --rows-per-sheet 20000
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from etl import REGISTRY_PATH, Registry, memory_report, process_sheets  # noqa: E402
+from synthetic import make_raw_sheets  # noqa: E402
+
+
+def to_legacy_schema(frame):
+    """Representasi sebelum skema ringkas: teks object, rupiah float64, TAHUN int64."""
+    legacy = frame.copy()
+    for col in legacy.columns:
+        if isinstance(legacy[col].dtype, pd.CategoricalDtype):
+            legacy[col] = legacy[col].astype(object)
+        elif col == 'TAHUN':
+            legacy[col] = legacy[col].astype('int64')
+        elif pd.api.types.is_integer_dtype(legacy[col]):
+            legacy[col] = legacy[col].astype('float64')
+    return legacy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows-per-sheet', type=int, default=20_000)
+    args = parser.parse_args()
+
+    registry = Registry.from_file(REGISTRY_PATH)
+    final_data, monthly_data = process_sheets(make_raw_sheets(registry, args.rows_per_sheet), registry)
+    before = memory_report({'final_data': to_legacy_schema(final_data),
+                            'monthly_data': to_legacy_schema(monthly_data)})
+    after = memory_report({'final_data': final_data, 'monthly_data': monthly_data})
+
+    report = before.merge(after, on=['frame', 'kolom'], suffixes=('_lama', '_ringkas'))
+    pd.set_option('display.width', 120)
+    print(report.to_string(index=False))
+    print()
+    for frame, group in report.groupby('frame'):
+        lama, ringkas = group['bytes_lama'].sum(), group['bytes_ringkas'].sum()
+        print(f"{frame:13s}: {lama / 2**20:8.2f} MiB -> {ringkas / 2**20:8.2f} MiB "
+              f"({ringkas / lama:.0%} dari semula)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark parsing nilai rupiah: `clean_numeric` lama (per sel via .apply)
+dibandingkan `parse_rupiah_frame` (vektorisasi) pada data sintetis.
+
+Jalankan dari root repo:
+    python benchmarks/bench_parse_rupiah.py --rows 100000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from etl import parse_rupiah_frame  # noqa: E402
+
+BULAN = ['JANUARI', 'FEBRUARI', 'MARET', 'APRIL', 'MEI', 'JUNI',
+         'JULI', 'AGUSTUS', 'SEPTEMBER', 'OKTOBER', 'NOVEMBER', 'DESEMBER']
+COLUMNS = ['Anggaran', 'Realisasi'] + [f'REALISASI {b}' for b in BULAN]
+
+
+def clean_numeric(value):
+    """Implementasi lama dari load_and_process_data, sebagai pembanding."""
+    if isinstance(value, str):
+        cleaned = value.replace("Rp", "").replace(",", "").replace(".", "").strip()
+        return float(cleaned) if cleaned.isdigit() else 0.0
+    return float(value) if pd.notna(value) else 0.0
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for col in COLUMNS:
+        amounts = rng.integers(0, 5 * 10**10, size=rows)
+        data[col] = [f"Rp{a:,}".replace(',', '.') for a in amounts]
+    return pd.DataFrame(data)
+
+
+def run_legacy(frame):
+    for col in COLUMNS:
+        frame[col] = pd.to_numeric(frame[col].apply(clean_numeric), errors='coerce')
+    return frame
+
+
+def run_vectorized(frame):
+    return parse_rupiah_frame(frame, COLUMNS)
+
+
+def timed(func, frame, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        work = frame.copy()
+        start = time.perf_counter()
+        result = func(work)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    frame = make_frame(args.rows)
+    legacy_time, legacy = timed(run_legacy, frame, args.repeat)
+    vector_time, vector = timed(run_vectorized, frame, args.repeat)
+
+    same = np.allclose(legacy[COLUMNS].to_numpy(float), vector[COLUMNS].to_numpy(float))
+    print(f"baris            : {args.rows:,} x {len(COLUMNS)} kolom")
+    print(f"clean_numeric    : {legacy_time:.3f} s")
+    print(f"parse_rupiah     : {vector_time:.3f} s")
+    print(f"percepatan       : {legacy_time / vector_time:.1f}x")
+    print(f"hasil identik    : {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Latensi rerun per interaksi pada tab dashboard.
+
+- "penuh"    : seluruh finish.py dijalankan ulang (perilaku tanpa fragment).
+- "fragment" : hanya fungsi tab yang dijalankan ulang (perilaku @st.fragment).
+
+Data dibaca dari snapshot yang sudah ada (lihat DASBOR_SNAPSHOT_DIR), jadi
+tidak ada akses ke Google Sheets. Jalankan dari root repo:
+    DASBOR_SNAPSHOT_DIR=.snapshot python benchmarks/bench_rerun.py
+"""
+import argparse
+import os
+import statistics
+import time
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FRAGMENT_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import finish
+
+cube = finish.load_and_process_data()[2]
+finish.{func}(cube, cube.years[0], cube.regions[0])
+"""
+
+
+def time_runs(app, change_widget, repeat):
+    samples = []
+    for i in range(repeat):
+        change_widget(app, i)
+        start = time.perf_counter()
+        app.run()
+        samples.append(time.perf_counter() - start)
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+    return samples
+
+
+def select_program(app, i):
+    box = app.selectbox[0]
+    box.set_value(box.options[i % len(box.options)])
+
+
+def select_trend_programs(app, i):
+    multi = app.multiselect[0]
+    multi.set_value(multi.options[:1 + i % len(multi.options)])
+
+
+INTERACTIONS = [
+    ('Program pada tab Jenis Belanja', 'show_sub_detail_pie', select_program),
+    ('Multiselect pada tab Tren Bulanan', 'show_monthly_trend', select_trend_programs),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    os.environ.setdefault('DASBOR_SNAPSHOT_TTL', '1e9')
+
+    print(f"{'interaksi':36s} {'penuh (ms)':>12s} {'fragment (ms)':>14s}")
+    for label, func, change_widget in INTERACTIONS:
+        full_app = AppTest.from_file(str(ROOT / 'finish.py'), default_timeout=60)
+        full_app.run()
+        full = time_runs(full_app, change_widget, args.repeat)
+
+        fragment_app = AppTest.from_string(FRAGMENT_SCRIPT.format(root=str(ROOT), func=func), default_timeout=60)
+        fragment_app.run()
+        fragment = time_runs(fragment_app, change_widget, args.repeat)
+
+        print(f"{label:36s} {statistics.median(full) * 1000:12.1f} {statistics.median(fragment) * 1000:14.1f}")
+
+
+if __name__ == '__main__':
+    main()
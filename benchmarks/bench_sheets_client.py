@@ -0,0 +1,176 @@
+"""
+Latensi pengambilan data Google Sheets terhadap server Sheets tiruan lokal.
+
+- "lama"     : setiap pembaruan membuat klien baru (service_account_from_dict +
+               open_by_url): tukar token OAuth dan koneksi baru setiap kali.
+- "bersama"  : `etl.open_sheets_source` memakai SheetsClient bersama: token dan
+               koneksi keep-alive dipakai ulang, metadata spreadsheet di-cache.
+
+Server tiruan melayani endpoint token, metadata spreadsheet, values:batchGet
+dan Drive files, dengan jeda buatan untuk tukar token dan pembukaan koneksi
+baru (pengganti TLS handshake). Jalankan dari root repo:
+    python benchmarks/bench_sheets_client.py --repeat 20
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import gspread
+import gspread.http_client
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import etl  # noqa: E402
+from synthetic import make_raw_sheets, make_registry  # noqa: E402
+
+SPREADSHEET_ID = 'mock-spreadsheet'
+SHEET_URL = f"https://docs.google.com/spreadsheets/d/{SPREADSHEET_ID}/edit"
+
+
+class MockSheetsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, sheets, token_latency, connect_latency):
+        super().__init__(('127.0.0.1', 0), MockSheetsHandler)
+        self.sheets = sheets
+        self.token_latency = token_latency
+        self.connect_latency = connect_latency
+        self.lock = threading.Lock()
+        self.counts = {'connections': 0, 'token': 0, 'requests': 0}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def reset_counts(self):
+        with self.lock:
+            self.counts = dict.fromkeys(self.counts, 0)
+
+
+class MockSheetsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+        time.sleep(self.server.connect_latency)
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path == '/token':
+            self.server.count('token')
+            time.sleep(self.server.token_latency)
+            self.send_json({'access_token': 'mock-token', 'expires_in': 3600, 'token_type': 'Bearer'})
+        else:
+            self.send_json({'error': {'code': 404, 'message': self.path}}, status=404)
+
+    def do_GET(self):
+        self.server.count('requests')
+        url = urlparse(self.path)
+        if url.path.endswith('/values:batchGet'):
+            ranges = parse_qs(url.query).get('ranges', [])
+            value_ranges = [{'range': r, 'values': self.server.sheets.get(r.strip("'"), [])} for r in ranges]
+            self.send_json({'spreadsheetId': SPREADSHEET_ID, 'valueRanges': value_ranges})
+        elif url.path.startswith('/drive/'):
+            self.send_json({'id': SPREADSHEET_ID, 'modifiedTime': '2024-01-01T00:00:00.000Z'})
+        elif re.fullmatch(r'/v4/spreadsheets/[^/]+', url.path):
+            sheets = [{'properties': {'title': name, 'sheetId': i, 'index': i}}
+                      for i, name in enumerate(self.server.sheets)]
+            self.send_json({'spreadsheetId': SPREADSHEET_ID, 'properties': {'title': 'Mock'}, 'sheets': sheets})
+        else:
+            self.send_json({'error': {'code': 404, 'message': self.path}}, status=404)
+
+
+def service_account_info(token_uri):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    return {
+        'type': 'service_account',
+        'project_id': 'mock',
+        'private_key_id': 'mock-key',
+        'private_key': pem,
+        'client_email': 'bench@mock.iam.gserviceaccount.com',
+        'client_id': '0',
+        'token_uri': token_uri,
+    }
+
+
+def point_gspread_at(base_url):
+    """Mengarahkan URL API yang dipakai gspread ke server tiruan."""
+    sheets_base = f"{base_url}/v4/spreadsheets"
+    gspread.http_client.SPREADSHEET_URL = sheets_base + "/%s"
+    gspread.http_client.SPREADSHEET_VALUES_BATCH_URL = sheets_base + "/%s/values:batchGet"
+    gspread.http_client.DRIVE_FILES_API_V3_URL = f"{base_url}/drive/v3/files"
+
+
+def refresh_lama(info, sheet_names):
+    gc = gspread.service_account_from_dict(info)
+    source = etl.SheetsSource(gc.open_by_url(SHEET_URL))
+    source.version()
+    return source.fetch(sheet_names)
+
+
+def refresh_bersama(info, sheet_names):
+    source = etl.open_sheets_source(SHEET_URL, info)
+    source.version()
+    return source.fetch(sheet_names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--rows-per-sheet', type=int, default=500)
+    parser.add_argument('--token-latency', type=float, default=0.05, help="detik per tukar token OAuth")
+    parser.add_argument('--connect-latency', type=float, default=0.03, help="detik per koneksi baru")
+    args = parser.parse_args()
+
+    registry = make_registry(regions=3)
+    raw = make_raw_sheets(registry, args.rows_per_sheet)
+    server = MockSheetsServer({spec.name: raw[spec.key] for spec in registry.sheets},
+                              args.token_latency, args.connect_latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    point_gspread_at(server.base_url)
+    info = service_account_info(f"{server.base_url}/token")
+    sheet_names = [spec.name for spec in registry.sheets]
+
+    print(f"{'mode':8s} {'median (ms)':>12s} {'min (ms)':>10s} {'token':>6s} {'koneksi':>8s} {'request':>8s}")
+    for mode, refresh in (('lama', refresh_lama), ('bersama', refresh_bersama)):
+        server.reset_counts()
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            data = refresh(info, sheet_names)
+            samples.append((time.perf_counter() - start) * 1000)
+            assert len(data) == len(sheet_names)
+        counts = server.counts
+        print(f"{mode:8s} {statistics.median(samples):12.2f} {min(samples):10.2f} "
+              f"{counts['token']:6d} {counts['connections']:8d} {counts['requests']:8d}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Waktu per tahap pipeline dasbor pada data sintetis yang ukurannya dapat diatur.
+
+Tahap yang diukur:
+- parse     : nilai mentah sheet -> frame ringkas (`etl.process_sheets`, inti `load_and_process_data`)
+- aggregate : membangun `AggregateCube` + pencarian total/ringkasan program seperti di `main()`
+- reshape   : data tren bulanan per (wilayah, tahun) + filter program seperti di `show_monthly_trend`
+- figure_*  : membangun figure Plotly seperti di fungsi `show_*` (tanpa cache)
+
+Hasil ditambahkan sebagai satu baris JSON ke berkas keluaran sehingga
+regresi dapat dilacak antar commit. Jalankan dari root repo:
+    python benchmarks/bench_stages.py --regions 3 --rows-per-sheet 20000
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import finish  # noqa: E402
+from etl import AggregateCube, process_sheets  # noqa: E402
+from synthetic import make_raw_sheets, make_registry  # noqa: E402
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "stages.jsonl"
+
+
+def time_stage(func, repeat):
+    """Menjalankan `func` sebanyak `repeat` kali; mengembalikan (hasil terakhir, statistik ms)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, {
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'repeat': repeat,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    registry = make_registry(args.regions)
+    raw_sheets = make_raw_sheets(registry, args.rows_per_sheet, years=args.years, programs=args.programs,
+                                 jenis=args.jenis, seed=args.seed)
+    stages = {}
+
+    (final_data, monthly_data), stages['parse'] = time_stage(lambda: process_sheets(raw_sheets, registry),
+                                                             args.repeat)
+
+    def aggregate():
+        cube = AggregateCube(final_data, monthly_data, version='bench')
+        for region in cube.regions:
+            for year in cube.years:
+                cube.totals(region, year)
+                cube.program_summary(region, year)
+        return cube
+
+    cube, stages['aggregate'] = time_stage(aggregate, args.repeat)
+    combos = [(region, year) for region in cube.regions for year in cube.years]
+
+    def reshape():
+        for region, year in combos:
+            bulan_df = cube.monthly_long(region, year)
+            programs = cube.monthly_programs(region, year)
+            bulan_df[bulan_df['PROGRAM PENGELOLAAN'].isin(programs)]
+
+    _, stages['reshape'] = time_stage(reshape, args.repeat)
+
+    # Figure dibangun untuk beberapa kombinasi pertama saja; waktunya per figure.
+    samples = combos[:args.figure_samples]
+
+    def per_figure(build):
+        def run_all():
+            for region, year in samples:
+                build(region, year)
+        _, stats = time_stage(run_all, args.repeat)
+        return {key: round(value / len(samples), 3) if key.endswith('_ms') else value for key, value in stats.items()}
+
+    def pie(region, year):
+        finish.build_pie_chart(cube.program_summary(region, year))
+
+    def sub_detail(region, year):
+        program = cube.program_summary(region, year)['PROGRAM PENGELOLAAN'].iloc[0]
+        finish.build_sub_detail_pie(cube.jenis_summary(region, year, program), program)
+
+    def trend(region, year):
+        finish.build_monthly_trend(cube.monthly_long(region, year), year, region)
+
+    stages['figure_pie'] = per_figure(pie)
+    stages['figure_sub_detail'] = per_figure(sub_detail)
+    stages['figure_trend'] = per_figure(trend)
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'params': {
+            'regions': args.regions,
+            'years': args.years,
+            'programs': args.programs,
+            'jenis': args.jenis,
+            'rows_per_sheet': args.rows_per_sheet,
+            'seed': args.seed,
+            'figure_samples': len(samples),
+        },
+        'rows': {'final_data': len(final_data), 'monthly_data': len(monthly_data)},
+        'stages': stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--regions', type=int, default=3, help="jumlah sheet kabupaten/kota (selain GRAND TOTAL)")
+    parser.add_argument('--years', type=int, default=6)
+    parser.add_argument('--programs', type=int, default=6)
+    parser.add_argument('--jenis', type=int, default=6, help="jumlah jenis belanja")
+    parser.add_argument('--rows-per-sheet', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--figure-samples', type=int, default=5, help="jumlah kombinasi wilayah/tahun untuk tahap figure")
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT, help="berkas JSON Lines tempat hasil ditambahkan")
+    args = parser.parse_args()
+
+    result = run(args)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(result) + "\n")
+
+    print(f"{'tahap':18s} {'median (ms)':>12s} {'min (ms)':>10s}")
+    for stage, stats in result['stages'].items():
+        print(f"{stage:18s} {stats['median_ms']:12.2f} {stats['min_ms']:10.2f}")
+    print(f"\nHasil ditambahkan ke {args.output}")
+
+
+if __name__ == '__main__':
+    main()
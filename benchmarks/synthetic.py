@@ -0,0 +1,76 @@
+"""
+Generator data anggaran sintetis untuk benchmark.
+
+Menghasilkan nilai mentah per sheet (baris pertama = header) dengan tata
+letak kolom yang sama seperti skema `grand_total` dan `regional` di
+registry.toml, sehingga bisa langsung diolah `etl.process_sheets`.
+"""
+import sys
+import tomllib
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from etl import REGISTRY_PATH, Registry, SheetSpec  # noqa: E402
+
+PROGRAMS = ['DANA ALOKASI UMUM', 'DANA BAGI HASIL', 'DANA ALOKASI KHUSUS FISIK',
+            'DANA ALOKASI KHUSUS NON FISIK', 'DANA DESA', 'DANA OTONOMI KHUSUS']
+JENIS_BELANJA = ['Belanja Pegawai', 'Belanja Barang dan Jasa', 'Belanja Modal',
+                 'Belanja Hibah', 'Belanja Bantuan Sosial', 'Belanja Bantuan Keuangan']
+
+
+def nama_berurutan(daftar, n, awalan):
+    """`n` nama pertama dari `daftar`, ditambah nama buatan bila kurang."""
+    return list(daftar[:n]) + [f"{awalan} {i + 1}" for i in range(len(daftar), n)]
+
+
+def format_rupiah(values):
+    return [f"Rp{v:,}".replace(',', '.') for v in values.tolist()]
+
+
+def make_registry(regions=3, path=REGISTRY_PATH):
+    """Registry sintetis: GRAND TOTAL + `regions` kabupaten/kota, skema kolom dari registry.toml."""
+    with open(path, 'rb') as f:
+        schemas = tomllib.load(f)['schemas']
+    sheets = [SheetSpec('GRAND TOTAL', 'sintetis', 'GRAND TOTAL', schemas['grand_total'], 'Beranda', 'Grand Total')]
+    for i in range(regions):
+        name = f"KAB SINTETIS {i + 1}"
+        sheets.append(SheetSpec(name, 'sintetis', name, schemas['regional'], name.title(), name.title()))
+    return Registry(sheets)
+
+
+def make_raw_sheets(registry, rows_per_sheet, years=6, programs=6, jenis=6, seed=0, start_year=2020):
+    """
+    Nilai mentah {key: baris} untuk setiap sheet di registry.
+    Baris dibagi rata ke kombinasi tahun × program × jenis belanja; sekitar
+    2% sel bulanan berformat khusus ("Rp -", "-") agar jalur parsing lambat ikut teruji.
+    """
+    rng = np.random.default_rng(seed)
+    program_names = nama_berurutan(PROGRAMS, programs, 'PROGRAM SINTETIS')
+    jenis_names = nama_berurutan(JENIS_BELANJA, jenis, 'Belanja Sintetis')
+    idx = np.arange(rows_per_sheet)
+    tahun = (start_year + idx % years).astype(str).tolist()
+    program = [program_names[i] for i in (idx // years) % programs]
+    jenis_belanja = [jenis_names[i] for i in (idx // (years * programs)) % jenis]
+
+    raw = {}
+    for spec in registry.sheets:
+        cols = spec.columns
+        pagu = rng.integers(10**8, 10**12, size=rows_per_sheet)
+        bulanan = rng.integers(0, pagu[:, None] // 12, size=(rows_per_sheet, 12))
+        total = bulanan.sum(axis=1)
+        bulanan_teks = np.array([format_rupiah(col) for col in bulanan.T], dtype=object).T
+        khusus = rng.random(bulanan.shape) < 0.02
+        bulanan_teks[khusus & (bulanan % 2 == 0)] = 'Rp -'
+        bulanan_teks[khusus & (bulanan % 2 == 1)] = '-'
+        pagu_teks, total_teks = format_rupiah(pagu), format_rupiah(total)
+
+        rows = [cols]
+        for i in range(rows_per_sheet):
+            row = [str(i + 1), spec.key, '51', jenis_belanja[i], program[i], tahun[i], pagu_teks[i]]
+            row += bulanan_teks[i].tolist() + [total_teks[i], f"{total[i] / pagu[i]:.0%}"]
+            row += ['Rp0'] * (len(cols) - len(row))
+            rows.append(row)
+        raw[spec.key] = rows
+    return raw
@@ -0,0 +1,1400 @@
+"""
+Pipeline data dasbor realisasi anggaran tanpa Streamlit.
+
+Modul ini mengunduh sheet dari registry, membersihkan angka rupiah,
+menyusun frame ringkas dan kubus agregat, serta menyimpan snapshot.
+Dipakai oleh finish.py, dan dapat dijalankan mandiri untuk menyiapkan
+artefak data secara offline (cron/CI):
+
+    python etl.py                      # ke .snapshot/ di samping etl.py
+    python etl.py --source data.xlsx --output /srv/dasbor/snapshot
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+import tomllib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import gspread
+import numpy as np
+import pandas as pd
+import requests
+from gspread.utils import fill_gaps
+
+logger = logging.getLogger(__name__)
+
+
+# --- REGISTRY WILAYAH (DARI registry.toml) ---
+REGISTRY_PATH = Path(os.environ.get("DASBOR_REGISTRY", Path(__file__).with_name("registry.toml")))
+
+# key = nilai kolom Wilayah; spreadsheet = URL (atau folder CSV); name = nama tab
+# total = None untuk sheet wilayah; "fetch"/"derive" untuk sheet jumlah semua wilayah (GRAND TOTAL)
+SheetSpec = namedtuple('SheetSpec', ['key', 'spreadsheet', 'name', 'columns', 'label', 'title', 'total'],
+                       defaults=(None,))
+TOTAL_MODES = ('fetch', 'derive')
+
+
+class Registry:
+    """Daftar sheet yang dimuat dashboard beserta skema kolom dan labelnya."""
+
+    def __init__(self, sheets):
+        self.sheets = list(sheets)
+        self._by_key = {spec.key: spec for spec in self.sheets}
+        if len(self._by_key) != len(self.sheets):
+            raise ValueError("Key wilayah di registry harus unik.")
+        for spec in self.sheets:
+            if spec.total is not None and spec.total not in TOTAL_MODES:
+                raise ValueError(f"total untuk sheet {spec.name!r} harus salah satu dari {TOTAL_MODES}.")
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+        schemas = config.get('schemas', {})
+        sheets = []
+        for spreadsheet in config.get('spreadsheets', []):
+            for sheet in spreadsheet.get('sheets', []):
+                label = sheet.get('label', sheet['name'])
+                sheets.append(SheetSpec(
+                    key=sheet.get('key', sheet['name']),
+                    spreadsheet=spreadsheet['url'],
+                    name=sheet['name'],
+                    columns=list(schemas[sheet['schema']]),
+                    label=label,
+                    title=sheet.get('title', label),
+                    total=sheet.get('total'),
+                ))
+        return cls(sheets)
+
+    @property
+    def keys(self):
+        return [spec.key for spec in self.sheets]
+
+    @property
+    def spreadsheets(self):
+        return list(dict.fromkeys(spec.spreadsheet for spec in self.sheets))
+
+    def sheets_in(self, spreadsheet):
+        """Sheet yang perlu diunduh dari spreadsheet ini (sheet total "derive" tidak diunduh)."""
+        return [spec for spec in self.sheets if spec.spreadsheet == spreadsheet and spec.total != 'derive']
+
+    @property
+    def total_sheets(self):
+        return [spec for spec in self.sheets if spec.total is not None]
+
+    @property
+    def regional_keys(self):
+        return [spec.key for spec in self.sheets if spec.total is None]
+
+    def get(self, key):
+        return self._by_key.get(key)
+
+    def label(self, key):
+        spec = self._by_key.get(key)
+        return spec.label if spec else key
+
+    def title(self, key):
+        spec = self._by_key.get(key)
+        return spec.title if spec else key
+
+
+# --- METRIK (WAKTU PER FASE & COUNTER CACHE) ---
+class Metrics:
+    """
+    Pencatat metrik ringan untuk seluruh proses (aman dipakai antar thread):
+    durasi per fase (jumlah, total, nilai terakhir) dan counter berlabel.
+    Dapat ditulis sebagai berkas teks format Prometheus untuk di-scrape.
+    """
+
+    def __init__(self, prefix='dasbor'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._phases = {}  # fase -> [jumlah, total detik, detik terakhir, waktu terakhir]
+        self._counters = {}  # (nama, label terurut) -> nilai
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            stats = self._phases.setdefault(phase, [0, 0.0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = seconds
+            stats[3] = time.time()
+
+    def incr(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def phases(self):
+        """{fase: (jumlah, total detik, detik terakhir, waktu terakhir)}"""
+        with self._lock:
+            return {phase: tuple(stats) for phase, stats in self._phases.items()}
+
+    def counters(self):
+        """{(nama, ((label, nilai), ...)): nilai}"""
+        with self._lock:
+            return dict(self._counters)
+
+    def to_prometheus(self):
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_phase_seconds Durasi fase pipeline/rerun dasbor.",
+            f"# TYPE {p}_phase_seconds summary",
+        ]
+        phases = sorted(self.phases().items())
+        for phase, (count, total, _, _) in phases:
+            lines.append(f'{p}_phase_seconds_sum{{phase="{phase}"}} {total:.6f}')
+            lines.append(f'{p}_phase_seconds_count{{phase="{phase}"}} {count}')
+        lines += [f"# HELP {p}_phase_last_seconds Durasi terakhir per fase.", f"# TYPE {p}_phase_last_seconds gauge"]
+        lines += [f'{p}_phase_last_seconds{{phase="{phase}"}} {last:.6f}' for phase, (_, _, last, _) in phases]
+
+        by_name = {}
+        for (name, labels), value in sorted(self.counters().items()):
+            by_name.setdefault(name, []).append((labels, value))
+        for name, series in by_name.items():
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            for labels, value in series:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{p}_{name}_total{{{label_text}}} {value}" if label_text else f"{p}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Menulis metrik secara atomik (format textfile collector Prometheus)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+METRICS = Metrics()
+
+
+# --- SUMBER DATA (GOOGLE SHEETS ATAU FIXTURE LOKAL) ---
+RETRY_STATUS = {429, 500, 502, 503, 504}  # batas kuota / gangguan sementara Sheets API
+RATE_LIMIT_RETRIES = 5
+BACKOFF_BASE = 1.0  # detik, dikali dua setiap percobaan
+BACKOFF_MAX = 60.0
+LOAD_WORKERS = 8  # thread untuk mengunduh & mengolah sheet secara paralel
+
+
+def is_retryable(exc):
+    """True untuk galat Sheets API yang layak dicoba ulang (429 atau 5xx)."""
+    return isinstance(exc, gspread.exceptions.APIError) and exc.code in RETRY_STATUS
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, maximum=BACKOFF_MAX):
+    """Jeda eksponensial dengan full jitter untuk percobaan ke-`attempt` (mulai 0)."""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+def with_backoff(call, retries=RATE_LIMIT_RETRIES):
+    """Menjalankan `call()`; galat kuota/5xx dicoba ulang dengan backoff eksponensial."""
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except Exception as e:
+            if not is_retryable(e) or attempt == retries:
+                raise
+            delay = backoff_delay(attempt)
+            METRICS.incr('sheets_api_retries', code=e.code)
+            logger.warning("Sheets API %s; mencoba lagi dalam %.1f detik.", e.code, delay)
+            time.sleep(delay)
+
+
+class SheetsSource:
+    """
+    Sumber data Google Sheets.
+    Semua sheet diambil dengan satu permintaan values:batchGet; jika gagal
+    (mis. ada sheet yang tidak ditemukan), tiap sheet diambil paralel.
+    Galat kuota (429) dan 5xx dicoba ulang dengan backoff, tanpa fallback
+    paralel yang justru menambah beban kuota.
+    """
+
+    def __init__(self, spreadsheet, max_workers=4):
+        self.spreadsheet = spreadsheet
+        self.max_workers = max_workers
+
+    def version(self):
+        """Waktu modifikasi terakhir spreadsheet (Drive API), atau None."""
+        try:
+            return with_backoff(self.spreadsheet.get_lastUpdateTime)
+        except Exception:
+            return None
+
+    def fetch(self, sheet_names):
+        """Mengembalikan dict {nama_sheet: daftar baris (list of list str)}."""
+        try:
+            return self._fetch_batch(sheet_names)
+        except Exception as e:
+            if is_retryable(e):
+                raise
+            return self._fetch_concurrent(sheet_names)
+
+    def _fetch_batch(self, sheet_names):
+        ranges = ["'{}'".format(name.replace("'", "''")) for name in sheet_names]
+        response = with_backoff(lambda: self.spreadsheet.values_batch_get(ranges))
+        value_ranges = response.get('valueRanges', [])
+        return {
+            name: fill_gaps(value_range.get('values', []))
+            for name, value_range in zip(sheet_names, value_ranges)
+        }
+
+    def _fetch_one(self, name):
+        try:
+            return with_backoff(lambda: self.spreadsheet.worksheet(name).get_all_values())
+        except Exception as e:
+            if is_retryable(e):
+                raise
+            return None
+
+    def _fetch_concurrent(self, sheet_names):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(self._fetch_one, sheet_names)
+            return {name: rows for name, rows in zip(sheet_names, results) if rows is not None}
+
+
+class LocalSource:
+    """
+    Sumber data dari folder berisi file CSV hasil ekspor (satu file per sheet,
+    mis. `KAB BIREUN.csv`). Dipakai sebagai pengganti Google Sheets untuk
+    pengujian dan benchmark.
+    """
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+
+    def version(self):
+        mtimes = [path.stat().st_mtime_ns for path in self.folder.glob("*.csv")]
+        return str(max(mtimes)) if mtimes else None
+
+    def fetch(self, sheet_names):
+        data = {}
+        for name in sheet_names:
+            path = self.folder / f"{name}.csv"
+            if not path.is_file():
+                continue
+            with open(path, newline='', encoding='utf-8') as f:
+                data[name] = list(csv.reader(f))
+        return data
+
+
+class ExcelSource:
+    """
+    Sumber data dari workbook XLSX hasil ekspor (satu tab per sheet).
+    Membutuhkan paket opsional `openpyxl`.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def version(self):
+        return str(self.path.stat().st_mtime_ns)
+
+    def fetch(self, sheet_names):
+        try:
+            workbook = pd.read_excel(self.path, sheet_name=None, header=None, dtype=str)
+        except ImportError as e:
+            raise RuntimeError("Membaca file XLSX membutuhkan paket openpyxl (pip install openpyxl).") from e
+        return {
+            name: workbook[name].fillna('').values.tolist()
+            for name in sheet_names
+            if name in workbook
+        }
+
+
+# --- KLIEN GOOGLE SHEETS (SESI TERAUTENTIKASI, DIPAKAI ULANG) ---
+HTTP_POOL_SIZE = 16  # koneksi keep-alive per host; >= jumlah thread unduh paralel
+
+
+class SheetsClient:
+    """
+    Klien gspread berumur panjang untuk satu service account.
+    Sesi AuthorizedSession-nya memperbarui token OAuth hanya saat kedaluwarsa,
+    koneksi HTTPS dipakai ulang lewat pool keep-alive, dan spreadsheet yang
+    sudah dibuka (metadata) disimpan sehingga open_by_url tidak diulang.
+    """
+
+    def __init__(self, gc, pool_size=HTTP_POOL_SIZE):
+        self.gc = gc
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        for prefix in ("https://", "http://"):
+            gc.http_client.session.mount(prefix, adapter)
+        self._lock = threading.Lock()
+        self._spreadsheets = {}
+
+    def open(self, sheet_url):
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(sheet_url)
+        if spreadsheet is None:
+            spreadsheet = with_backoff(lambda: self.gc.open_by_url(sheet_url))
+            with self._lock:
+                spreadsheet = self._spreadsheets.setdefault(sheet_url, spreadsheet)
+        return spreadsheet
+
+
+_sheets_clients = {}
+_sheets_clients_lock = threading.Lock()
+
+
+def get_sheets_client(credentials=None):
+    """
+    SheetsClient bersama untuk seluruh proses, satu per service account.
+    `credentials` berupa dict service account; bila None dipakai file dari
+    GOOGLE_APPLICATION_CREDENTIALS atau lokasi bawaan gspread.
+    """
+    if credentials is not None:
+        key = (credentials['client_email'], credentials.get('private_key_id'))
+    else:
+        key = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", gspread.auth.DEFAULT_SERVICE_ACCOUNT_FILENAME)
+    with _sheets_clients_lock:
+        client = _sheets_clients.get(key)
+        if client is None:
+            if credentials is not None:
+                gc = gspread.service_account_from_dict(credentials)
+            else:
+                gc = gspread.service_account(filename=key)
+            client = _sheets_clients[key] = SheetsClient(gc)
+            METRICS.incr('sheets_clients_created')
+    return client
+
+
+def open_sheets_source(sheet_url, credentials=None):
+    """Membuka spreadsheet Google lewat klien bersama (lihat get_sheets_client)."""
+    return SheetsSource(get_sheets_client(credentials).open(sheet_url))
+
+
+def open_source(location, credentials=None):
+    """Folder CSV -> LocalSource, file .xlsx -> ExcelSource, selain itu URL Google Sheets."""
+    path = Path(location)
+    if path.is_dir():
+        return LocalSource(location)
+    if path.suffix.lower() == '.xlsx' and path.is_file():
+        return ExcelSource(location)
+    return open_sheets_source(location, credentials)
+
+
+def fetch_registry(registry, open_source=open_source, max_workers=None):
+    """
+    Mengunduh semua sheet registry, satu thread per spreadsheet.
+    Mengembalikan (versi per spreadsheet, {key: baris}).
+    """
+    def fetch_one(location):
+        source = open_source(location)
+        specs = registry.sheets_in(location)
+        raw = source.fetch([spec.name for spec in specs])
+        return source.version(), {spec.key: raw[spec.name] for spec in specs if spec.name in raw}
+
+    versions = {}
+    raw_sheets = {}
+    locations = registry.spreadsheets
+    with ThreadPoolExecutor(max_workers=max_workers or LOAD_WORKERS) as executor:
+        for location, (version, raw) in zip(locations, executor.map(fetch_one, locations)):
+            versions[location] = version
+            raw_sheets.update(raw)
+    return versions, raw_sheets
+
+
+# --- PARSING NILAI RUPIAH (VEKTORISASI) ---
+# Format yang paling umum: "Rp1.234.567", "Rp 1,234,567", "1234567" atau kosong.
+POLA_RUPIAH_SEDERHANA = r'\s*(?:Rp\.?\s*)?(?:\d{1,3}(?:\.\d{3}){1,5}|\d{1,3}(?:,\d{3}){1,5}|\d{1,18})?\s*'
+
+
+def _parse_rupiah_umum(text):
+    """Jalur lengkap untuk nilai negatif, desimal, atau format tidak lazim."""
+    negative = text.str.contains(r'^[^\d]*[-−(]', regex=True)
+    text = text.str.replace(r'[^\d.,]', '', regex=True)
+
+    last_dot = text.str.rfind('.')
+    last_comma = text.str.rfind(',')
+    length = text.str.len()
+    # Pemisah tunggal yang diikuti tepat tiga digit dianggap pemisah ribuan.
+    single_dot = (text.str.count(r'\.') == 1) & (last_comma < 0) & (length - last_dot - 1 != 3)
+    single_comma = (text.str.count(',') == 1) & (last_dot < 0) & (length - last_comma - 1 != 3)
+    decimal_comma = ((last_dot >= 0) & (last_comma > last_dot)) | single_comma
+    decimal_dot = ((last_comma >= 0) & (last_dot > last_comma)) | single_dot
+
+    cleaned = text.str.replace(r'[.,]', '', regex=True)
+    cleaned = cleaned.mask(decimal_comma, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    cleaned = cleaned.mask(decimal_dot, text.str.replace(',', '', regex=False))
+
+    result = pd.to_numeric(cleaned, errors='coerce').astype('float64').fillna(0.0)
+    return result.where(~negative | (result == 0), -result)
+
+
+def parse_rupiah(values, dtype='float64'):
+    """
+    Mengubah Series teks rupiah menjadi angka sekaligus (tanpa .apply).
+    Mendukung awalan "Rp", pemisah ribuan titik/koma, desimal koma
+    ("1.234,56"), angka negatif ("-Rp 1.000" atau "(1.000)").
+    Nilai yang tidak bisa dibaca menjadi 0. Dengan dtype='int64' hasilnya
+    rupiah bulat yang eksak (nilai berdesimal dibulatkan setengah menjauhi
+    nol: 12,5 -> 13, -12,5 -> -13).
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return _to_dtype(pd.to_numeric(values, errors='coerce').fillna(0.0), dtype)
+
+    text = values.astype('str').fillna('')
+    special = ~text.str.fullmatch(POLA_RUPIAH_SEDERHANA)
+
+    # Jalur cepat: cukup buang "Rp" dan pemisah ribuan lalu cast langsung.
+    digits = (
+        text.where(~special, '')
+        .str.replace('Rp', '', regex=False)
+        .str.replace('.', '', regex=False)
+        .str.replace(',', '', regex=False)
+        .str.strip()
+    )
+    result = digits.where(digits != '', '0').astype(dtype)
+    if special.any():
+        result[special] = _to_dtype(_parse_rupiah_umum(text[special]), dtype)
+    return result
+
+
+def _to_dtype(values, dtype):
+    if pd.api.types.is_integer_dtype(dtype):
+        # Bukan np.rint (pembulatan ke genap): setengah rupiah selalu dibulatkan menjauhi nol
+        array = values.to_numpy(dtype='float64')
+        return pd.Series(np.sign(array) * np.floor(np.abs(array) + 0.5), index=values.index).astype(dtype)
+    return values.astype(dtype)
+
+
+def parse_rupiah_frame(frame, columns, dtype='float64'):
+    """Mem-parsing beberapa kolom rupiah dalam satu lintasan, di tempat."""
+    if frame.empty or not columns:
+        return frame
+    stacked = pd.concat([frame[col] for col in columns], ignore_index=True)
+    parsed = parse_rupiah(stacked, dtype=dtype).to_numpy().reshape(len(columns), len(frame)).T
+    frame[columns] = pd.DataFrame(parsed, index=frame.index, columns=columns)
+    return frame
+
+
+# --- PENGOLAHAN SHEET ---
+BULAN = ['JANUARI', 'FEBRUARI', 'MARET', 'APRIL', 'MEI', 'JUNI',
+         'JULI', 'AGUSTUS', 'SEPTEMBER', 'OKTOBER', 'NOVEMBER', 'DESEMBER']
+BULAN_COLS = [f'REALISASI {bulan}' for bulan in BULAN]
+
+# Skema ringkas: dimensi kategorikal, rupiah bulat eksak, tahun 16-bit.
+DIMENSION_COLS = ['Wilayah', 'PROGRAM PENGELOLAAN', 'Jenis Belanja', 'Bulan']
+RUPIAH_DTYPE = 'int64'
+TAHUN_DTYPE = 'int16'
+
+
+def process_sheet(spec, values):
+    """
+    Mengolah nilai mentah satu sheet (SheetSpec) menjadi (data_utama, data_bulanan).
+    Mengembalikan None bila sheet kosong atau strukturnya tidak sesuai skema.
+    """
+    try:
+        rows = values[1:]
+        if not rows:
+            return None
+        df_raw = pd.DataFrame(rows)
+        col_map = spec.columns
+        if len(df_raw.columns) != len(col_map):
+            return None
+        df_raw.columns = col_map
+        df_raw.rename(columns={'NMAKUN': 'Jenis Belanja'}, inplace=True)
+
+        # Semua sheet (termasuk GRAND TOTAL) diproses untuk data bulanan.
+        monthly_cols = ['PROGRAM PENGELOLAAN', 'TAHUN'] + [col for col in df_raw.columns if 'REALISASI' in col and 'Total' not in col]
+        monthly_df = df_raw[monthly_cols].copy()
+        monthly_df['Wilayah'] = spec.key
+        parse_rupiah_frame(monthly_df, monthly_cols[2:], dtype=RUPIAH_DTYPE)
+        monthly_df['TAHUN'] = monthly_df['TAHUN'].astype(TAHUN_DTYPE)
+
+        df_raw['PROGRAM PENGELOLAAN'] = df_raw['PROGRAM PENGELOLAAN'].str.strip().str.upper()
+        df_raw = df_raw[df_raw['Jenis Belanja'].astype(str).str.strip() != ''].copy()
+        cols_to_keep = ['Jenis Belanja', 'PROGRAM PENGELOLAAN', 'TAHUN', 'PAGU', 'Total']
+        # Kolom Selisih (Pagu - Realisasi) sheet total hanya dipakai untuk rekonsiliasi
+        rupiah_cols = ['Anggaran', 'Realisasi'] + (['Selisih'] if spec.total and 'Selisih' in df_raw else [])
+        df_processed = df_raw[cols_to_keep + rupiah_cols[2:]].copy()
+        df_processed.rename(columns={'PAGU': 'Anggaran', 'Total': 'Realisasi'}, inplace=True)
+        df_processed['Wilayah'] = spec.key
+        parse_rupiah_frame(df_processed, rupiah_cols, dtype=RUPIAH_DTYPE)
+        df_processed.dropna(subset=['TAHUN', 'Anggaran', 'Realisasi'], inplace=True)
+        df_processed['TAHUN'] = df_processed['TAHUN'].astype(TAHUN_DTYPE)
+    except Exception:
+        return None
+    return df_processed, monthly_df
+
+
+def compact_frame(frame):
+    """Menerapkan skema ringkas pada frame gabungan (di tempat)."""
+    for col in frame.columns:
+        if col in DIMENSION_COLS and not isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype('category')
+        elif col in ('Anggaran', 'Realisasi') or col.startswith('REALISASI '):
+            if not pd.api.types.is_integer_dtype(frame[col]):
+                frame[col] = _to_dtype(frame[col].fillna(0), RUPIAH_DTYPE)
+        elif col == 'TAHUN':
+            frame[col] = frame[col].astype(TAHUN_DTYPE)
+        elif col == 'Selisih':
+            # Hanya ada di sheet total; baris sheet lain bernilai NA
+            frame[col] = frame[col].astype('Int64')
+    return frame
+
+
+def memory_report(frames):
+    """Ringkasan pemakaian memori (deep) per frame dan per kolom, dalam byte."""
+    rows = []
+    for name, frame in frames.items():
+        usage = frame.memory_usage(deep=True, index=False)
+        rows.extend({'frame': name, 'kolom': col, 'dtype': str(frame[col].dtype), 'bytes': int(nbytes)}
+                    for col, nbytes in usage.items())
+    return pd.DataFrame(rows, columns=['frame', 'kolom', 'dtype', 'bytes'])
+
+
+def combine_sheet_frames(sheet_frames, keys):
+    """Menggabungkan hasil process_sheet per sheet (urut sesuai `keys`)."""
+    parsed = [sheet_frames[key] for key in keys if sheet_frames.get(key) is not None]
+    if not parsed:
+        return pd.DataFrame(), pd.DataFrame()
+    # Kategori disusun setelah penggabungan agar semua sheet berbagi kamus yang sama.
+    # Selisih ikut disimpan di snapshot agar rekonsiliasi sesudah restart tetap sama.
+    final_data = compact_frame(pd.concat([frames[0] for frames in parsed], ignore_index=True))
+    monthly_data = compact_frame(pd.concat([frames[1] for frames in parsed], ignore_index=True))
+    return final_data, monthly_data
+
+
+def split_sheet_frames(final_data, monthly_data, keys):
+    """Kebalikan combine_sheet_frames: memecah frame gabungan per Wilayah."""
+    sheet_frames = {}
+    for key in keys:
+        final_slice = final_data[final_data['Wilayah'] == key].reset_index(drop=True)
+        if final_slice.empty:
+            continue
+        if 'Selisih' in final_slice and final_slice['Selisih'].isna().all():
+            final_slice = final_slice.drop(columns='Selisih')
+        monthly_slice = monthly_data[monthly_data['Wilayah'] == key].reset_index(drop=True)
+        sheet_frames[key] = (final_slice, monthly_slice)
+    return sheet_frames
+
+
+def hash_sheet_values(values):
+    """Sidik jari isi sheet untuk mendeteksi perubahan."""
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def parse_sheets(raw_sheets, registry, max_workers=None):
+    """Mengolah nilai mentah tiap sheet ({key: baris}) secara paralel menjadi {key: (final, monthly)}."""
+    specs = [registry.get(key) for key in raw_sheets if registry.get(key) is not None]
+    with ThreadPoolExecutor(max_workers=max_workers or LOAD_WORKERS) as executor:
+        parsed = executor.map(lambda spec: process_sheet(spec, raw_sheets[spec.key]), specs)
+        return {spec.key: frames for spec, frames in zip(specs, parsed)}
+
+
+def process_sheets(raw_sheets, registry, max_workers=None):
+    """
+    Mengolah nilai mentah tiap sheet ({key: baris}) menjadi (final_data, monthly_data),
+    termasuk sheet total turunan (lihat apply_total_sheets).
+    """
+    sheet_frames, _ = apply_total_sheets(parse_sheets(raw_sheets, registry, max_workers), registry)
+    return combine_sheet_frames(sheet_frames, registry.keys)
+
+
+# --- GRAND TOTAL TURUNAN & REKONSILIASI ---
+RECONCILE_TOLERANCE = 1  # rupiah; selisih pembulatan yang masih dianggap cocok
+RECONCILE_COLUMNS = ['TAHUN', 'PROGRAM PENGELOLAAN', 'Ukuran', 'Publikasi', 'Turunan', 'Selisih']
+
+
+def _as_text_keys(frame, keys):
+    return frame.assign(**{key: frame[key].astype(str) for key in keys if key != 'TAHUN'})
+
+
+def derive_total_frames(regional_frames, key):
+    """(final, monthly) sheet total sebagai jumlah semua sheet wilayah, dengan Wilayah = `key`."""
+    final = pd.concat([frames[0].drop(columns='Selisih', errors='ignore') for frames in regional_frames],
+                      ignore_index=True)
+    monthly = pd.concat([frames[1] for frames in regional_frames], ignore_index=True)
+
+    final_keys = ['Jenis Belanja', 'PROGRAM PENGELOLAAN', 'TAHUN']
+    derived_final = (_as_text_keys(final, final_keys)
+                     .groupby(final_keys, sort=False)[['Anggaran', 'Realisasi']].sum().reset_index())
+    derived_final['Wilayah'] = key
+
+    monthly_keys = ['PROGRAM PENGELOLAAN', 'TAHUN']
+    derived_monthly = (_as_text_keys(monthly, monthly_keys)
+                       .groupby(monthly_keys, sort=False)[BULAN_COLS].sum().reset_index())
+    derived_monthly['Wilayah'] = key
+    return derived_final, derived_monthly
+
+
+def has_selisih(final):
+    """True bila sheet mengisi kolom Selisih (kolom yang seluruhnya kosong/nol dianggap tidak diisi)."""
+    return 'Selisih' in final and bool(final['Selisih'].fillna(0).ne(0).any())
+
+
+def reconcile_total(published, derived, tolerance=RECONCILE_TOLERANCE):
+    """
+    Membandingkan sheet total yang dipublikasikan dengan hasil turunan per
+    (TAHUN, Program) untuk Anggaran, Realisasi, realisasi tiap bulan, dan
+    Selisih (Pagu - Realisasi; hanya bila sheet mengisinya), sekaligus secara
+    vektor. Mengembalikan baris yang tidak cocok (kolom RECONCILE_COLUMNS).
+    """
+    keys = ['TAHUN', 'PROGRAM PENGELOLAAN']
+    measures = ['Anggaran', 'Realisasi'] + (['Selisih'] if has_selisih(published[0]) else []) + BULAN_COLS
+    derived_final = derived[0].assign(Selisih=derived[0]['Anggaran'] - derived[0]['Realisasi'])
+
+    def wide(final, monthly):
+        final, monthly = _as_text_keys(final, keys), _as_text_keys(monthly, keys)
+        # Label program data bulanan disamakan dengan data utama (trim + kapital)
+        monthly['PROGRAM PENGELOLAAN'] = monthly['PROGRAM PENGELOLAAN'].str.strip().str.upper()
+        value_cols = [col for col in measures if col in final]
+        return (final.groupby(keys)[value_cols].sum()
+                .join(monthly.groupby(keys)[BULAN_COLS].sum(), how='outer')
+                .fillna(0)
+                .astype('int64'))
+
+    pub, der = wide(*published).align(wide(derived_final, derived[1]), join='outer', fill_value=0)
+    pub, der = pub[measures], der[measures]
+    diff = pub - der
+
+    mismatch = diff.abs().to_numpy() > tolerance
+    rows, cols = np.nonzero(mismatch)
+    if len(rows) == 0:
+        return pd.DataFrame(columns=RECONCILE_COLUMNS)
+
+    index = diff.index[rows]
+    return pd.DataFrame({
+        'TAHUN': index.get_level_values('TAHUN').astype(int),
+        'PROGRAM PENGELOLAAN': index.get_level_values('PROGRAM PENGELOLAAN'),
+        'Ukuran': [measures[col].replace('REALISASI ', 'Realisasi ').title() for col in cols],
+        'Publikasi': pub.to_numpy()[rows, cols].astype('int64'),
+        'Turunan': der.to_numpy()[rows, cols].astype('int64'),
+        'Selisih': diff.to_numpy()[rows, cols].astype('int64'),
+    })
+
+
+def apply_total_sheets(sheet_frames, registry):
+    """
+    Memproses sheet total di registry: mode "derive" diisi dari jumlah sheet
+    wilayah (tanpa diunduh), mode "fetch" direkonsiliasi dengan jumlah itu.
+    Mengembalikan (sheet_frames, {key: DataFrame ketidakcocokan}).
+    """
+    regional = [sheet_frames[key] for key in registry.regional_keys if sheet_frames.get(key) is not None]
+    sheet_frames = dict(sheet_frames)
+    reports = {}
+    for spec in registry.total_sheets:
+        # Selama ada sheet wilayah yang belum dimuat (muatan parsial), jumlahnya belum bermakna
+        if not regional or len(regional) < len(registry.regional_keys):
+            continue
+        derived = derive_total_frames(regional, spec.key)
+        if spec.total == 'derive':
+            sheet_frames[spec.key] = derived
+        elif sheet_frames.get(spec.key) is not None:
+            reports[spec.key] = reconcile_total(sheet_frames[spec.key], derived)
+    return sheet_frames, reports
+
+
+# --- KUBUS AGREGAT (DIHITUNG SEKALI PER PEMUATAN DATA) ---
+def hitung_persentase(anggaran, realisasi):
+    """Persentase realisasi terhadap anggaran; 0 bila anggaran tidak positif."""
+    anggaran = np.asarray(anggaran, dtype='float64')
+    realisasi = np.asarray(realisasi, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(anggaran > 0, realisasi / anggaran * 100, 0.0)
+
+
+class AggregateCube:
+    """
+    Agregat Anggaran/Realisasi per Wilayah × TAHUN × Program × Jenis Belanja,
+    lengkap dengan persentasenya. Dibangun sekali setiap data dimuat, sehingga
+    setiap perubahan filter cukup berupa pencarian dict.
+    """
+
+    def __init__(self, final_data, monthly_data, version=None, reconciliation=None):
+        self.version = version
+        # {key sheet total: DataFrame ketidakcocokan terhadap jumlah sheet wilayah}
+        self.reconciliation = reconciliation or {}
+        self._build_monthly(monthly_data)
+        keys = ['Wilayah', 'TAHUN', 'PROGRAM PENGELOLAAN', 'Jenis Belanja']
+        base = final_data.groupby(keys, sort=False, observed=True)[['Anggaran', 'Realisasi']].sum().reset_index()
+        base['Persentase'] = hitung_persentase(base['Anggaran'], base['Realisasi'])
+        # Label program/jenis belanja sebagai teks biasa untuk tabel dan grafik
+        base[keys[2:]] = base[keys[2:]].astype(str)
+
+        self.regions = sorted(final_data['Wilayah'].unique())
+        self.years = sorted(final_data['TAHUN'].unique(), reverse=True)
+
+        # (wilayah, tahun, program) -> ringkasan per jenis belanja, terbesar dulu
+        self._jenis = {
+            key: group[['Jenis Belanja', 'Anggaran', 'Realisasi', 'Persentase']]
+            .sort_values('Anggaran', ascending=False)
+            .reset_index(drop=True)
+            for key, group in base.groupby(keys[:3], sort=False, observed=True)
+        }
+
+        programs = base.groupby(keys[:3], sort=False, observed=True)[['Anggaran', 'Realisasi']].sum().reset_index()
+        programs['Persentase'] = hitung_persentase(programs['Anggaran'], programs['Realisasi'])
+        # (wilayah, tahun) -> ringkasan per program (urutan kemunculan di sheet)
+        self._programs = {
+            key: group[['PROGRAM PENGELOLAAN', 'Anggaran', 'Realisasi', 'Persentase']].reset_index(drop=True)
+            for key, group in programs.groupby(keys[:2], sort=False, observed=True)
+        }
+
+        totals = programs.groupby(keys[:2], sort=False, observed=True)[['Anggaran', 'Realisasi']].sum()
+        persen = hitung_persentase(totals['Anggaran'], totals['Realisasi'])
+        # (wilayah, tahun) -> (total anggaran, total realisasi, persentase)
+        self._totals = {
+            key: (anggaran, realisasi, p)
+            for key, anggaran, realisasi, p in zip(totals.index, totals['Anggaran'], totals['Realisasi'], persen)
+        }
+
+    def _build_monthly(self, monthly_data):
+        """
+        Membentuk data bulanan sekali saat pemuatan:
+        - `monthly_values`: array padat (wilayah, tahun, program) × 12 bulan
+        - tampilan long-format siap pakai per (wilayah, tahun) untuk grafik tren
+        """
+        keys = ['Wilayah', 'TAHUN', 'PROGRAM PENGELOLAAN']
+        if monthly_data.empty:
+            self.monthly_index = pd.MultiIndex.from_tuples([], names=keys)
+            self.monthly_values = np.zeros((0, len(BULAN)), dtype=RUPIAH_DTYPE)
+            self._monthly_program = np.array([], dtype=object)
+            self.programs = []
+            self._monthly_rows = {}
+            self._monthly_long = {}
+            return
+
+        grouped = monthly_data.groupby(keys, sort=True, observed=True)[BULAN_COLS].sum()
+        self.monthly_index = grouped.index
+        self.monthly_values = grouped.to_numpy()
+
+        index_df = grouped.index.to_frame(index=False)
+        index_df[['Wilayah', 'PROGRAM PENGELOLAAN']] = index_df[['Wilayah', 'PROGRAM PENGELOLAAN']].astype(str)
+        n_rows, n_bulan = self.monthly_values.shape
+        long = pd.DataFrame({
+            'PROGRAM PENGELOLAAN': np.repeat(index_df['PROGRAM PENGELOLAAN'].to_numpy(), n_bulan),
+            'TAHUN': np.repeat(index_df['TAHUN'].to_numpy(), n_bulan),
+            'Wilayah': np.repeat(index_df['Wilayah'].to_numpy(), n_bulan),
+            'Bulan': pd.Categorical.from_codes(np.tile(np.arange(n_bulan), n_rows), categories=BULAN, ordered=True),
+            'Realisasi': self.monthly_values.ravel(),
+        })
+
+        self._monthly_program = index_df['PROGRAM PENGELOLAAN'].to_numpy()
+        self.programs = sorted(set(self._monthly_program))  # semua program yang punya data bulanan
+
+        # Baris terurut sehingga setiap (wilayah, tahun) menempati rentang yang berurutan.
+        self._monthly_rows = {}
+        self._monthly_long = {}
+        for key, positions in index_df.groupby(['Wilayah', 'TAHUN'], sort=False).indices.items():
+            rows = slice(positions.min(), positions.max() + 1)
+            self._monthly_rows[key] = rows
+            self._monthly_long[key] = long.iloc[rows.start * n_bulan:rows.stop * n_bulan].reset_index(drop=True)
+
+    def monthly_programs(self, region, year):
+        """Daftar program yang memiliki data bulanan (urut abjad)."""
+        rows = self._monthly_rows.get((region, year))
+        if rows is None:
+            return []
+        return self.monthly_index[rows].get_level_values('PROGRAM PENGELOLAAN').astype(str).tolist()
+
+    def monthly_array(self, region, year):
+        """Array (program × 12 bulan) untuk satu wilayah dan tahun."""
+        rows = self._monthly_rows.get((region, year))
+        if rows is None:
+            return self.monthly_values[:0]
+        return self.monthly_values[rows]
+
+    def monthly_long(self, region, year):
+        """Tampilan long-format (Program, TAHUN, Wilayah, Bulan, Realisasi)."""
+        return self._monthly_long.get((region, year))
+
+    def monthly_series(self, series, programs=None, cumulative=False):
+        """
+        Matriks realisasi (len(series) × 12): satu baris per (wilayah, tahun),
+        dijumlahkan atas `programs` (None = semua program); seri tanpa data = 0.
+        `cumulative=True` menghasilkan kurva realisasi kumulatif.
+        """
+        values = self.monthly_values
+        if programs is not None:
+            values = np.where(np.isin(self._monthly_program, list(programs))[:, None], values, 0)
+        out = np.zeros((len(series), values.shape[1]), dtype=values.dtype)
+        for i, key in enumerate(series):
+            rows = self._monthly_rows.get(key)
+            if rows is not None:
+                out[i] = values[rows].sum(axis=0)
+        return np.cumsum(out, axis=1) if cumulative else out
+
+    def yoy_delta(self, series, programs=None, cumulative=False):
+        """
+        Selisih tiap seri terhadap (wilayah, tahun - 1) per bulan, dalam rupiah.
+        Baris bernilai NaN bila tahun sebelumnya tidak ada di data.
+        """
+        previous = [(region, year - 1) for region, year in series]
+        delta = (self.monthly_series(series, programs, cumulative)
+                 - self.monthly_series(previous, programs, cumulative)).astype('float64')
+        delta[[key not in self._monthly_rows for key in previous]] = np.nan
+        return delta
+
+    def totals(self, region, year):
+        return self._totals.get((region, year))
+
+    def program_summary(self, region, year):
+        return self._programs.get((region, year), pd.DataFrame(columns=['PROGRAM PENGELOLAAN', 'Anggaran', 'Realisasi', 'Persentase']))
+
+    def jenis_summary(self, region, year, program):
+        return self._jenis.get((region, year, program), pd.DataFrame(columns=['Jenis Belanja', 'Anggaran', 'Realisasi', 'Persentase']))
+
+
+# --- SNAPSHOT DI DISK (STALE-WHILE-REVALIDATE) ---
+# Default di samping modul (seperti REGISTRY_PATH) agar dasbor dan CLI memakai folder yang sama dari CWD mana pun
+SNAPSHOT_DIR = Path(os.environ.get("DASBOR_SNAPSHOT_DIR", Path(__file__).with_name(".snapshot")))
+SNAPSHOT_TTL = float(os.environ.get("DASBOR_SNAPSHOT_TTL", 300))  # detik sebelum snapshot dianggap basi
+REFRESH_AHEAD = 0.8  # refresher latar belakang memperbarui setelah 80% TTL, sebelum data basi
+REFRESH_RETRY_BASE = 5.0  # detik jeda setelah pembaruan gagal, dikali dua setiap kegagalan beruntun
+CURRENT_FILE = "CURRENT"  # penunjuk artefak aktif di folder keluaran CLI
+ARTIFACT_KEEP = 5  # jumlah artefak lama yang disimpan untuk rollback
+
+
+def save_snapshot(folder, final_data, monthly_data, meta=None):
+    """Menyimpan kedua frame sebagai Parquet secara atomik (tulis lalu rename)."""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    for name, frame in (('final_data', final_data), ('monthly_data', monthly_data)):
+        tmp_path = folder / f"{name}.parquet.tmp"
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, folder / f"{name}.parquet")
+    return save_snapshot_meta(folder, meta)
+
+
+def save_snapshot_meta(folder, meta=None):
+    meta = dict(meta or {}, saved_at=time.time())
+    tmp_meta = Path(folder) / "meta.json.tmp"
+    tmp_meta.write_text(json.dumps(meta))
+    os.replace(tmp_meta, Path(folder) / "meta.json")
+    return meta
+
+
+def resolve_snapshot_dir(folder):
+    """
+    Folder berisi snapshot aktif. Bila ada berkas CURRENT (hasil CLI etl.py),
+    isinya menunjuk subfolder artefak versi terbaru; bila tidak, folder itu sendiri.
+    """
+    folder = Path(folder)
+    try:
+        name = (folder / CURRENT_FILE).read_text().strip()
+    except OSError:
+        return folder
+    return folder / name if name else folder
+
+
+def load_snapshot(folder):
+    """Membaca snapshot; mengembalikan (final_data, monthly_data, meta) atau None."""
+    folder = resolve_snapshot_dir(folder)
+    try:
+        meta = json.loads((folder / "meta.json").read_text())
+        final_data = pd.read_parquet(folder / "final_data.parquet")
+        monthly_data = pd.read_parquet(folder / "monthly_data.parquet")
+    except (OSError, ValueError):
+        return None
+    return final_data, monthly_data, meta
+
+
+def data_version(meta):
+    """Pengenal isi data: berubah hanya bila ada sheet yang isinya berubah."""
+    sheet_hashes = meta.get('sheet_hashes')
+    if sheet_hashes:
+        return hash_sheet_values(sorted(sheet_hashes.items()))
+    return str(meta.get('saved_at'))
+
+
+def publish_artifact(folder, final_data, monthly_data, meta, keep=ARTIFACT_KEEP):
+    """
+    Menulis snapshot sebagai artefak berversi (subfolder baru), lalu
+    memindahkan penunjuk CURRENT secara atomik dan membuang artefak lama
+    di luar `keep` terbaru. Mengembalikan nama artefak.
+    """
+    folder = Path(folder)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{data_version(meta)[:8]}"
+    save_snapshot(folder / name, final_data, monthly_data, meta)
+
+    tmp_current = folder / f"{CURRENT_FILE}.tmp"
+    tmp_current.write_text(name)
+    os.replace(tmp_current, folder / CURRENT_FILE)
+
+    artifacts = sorted(path for path in folder.iterdir() if path.is_dir() and (path / "meta.json").exists())
+    for old in artifacts[:-keep] if keep > 0 else []:
+        if old.name != name:
+            shutil.rmtree(old, ignore_errors=True)
+    return name
+
+
+class SnapshotStore:
+    """
+    Menyimpan data terolah di memori proses dan di disk.
+    `get()` tidak pernah menunggu jaringan: bila snapshot sudah basi,
+    pembaruan dijalankan di thread latar belakang (satu per waktu).
+    Pembaruan bersifat inkremental: hanya sheet yang isinya berubah
+    (berdasarkan hash nilai mentah) yang diolah ulang.
+
+    Bila folder berisi penunjuk CURRENT (artefak dari `python etl.py`),
+    pembaruan cukup membaca ulang artefak terbaru dari disk tanpa
+    menghubungi Google Sheets.
+
+    Pembaruan bersifat single-flight untuk seluruh proses: pemanggil yang
+    datang saat pembaruan berjalan menunggu dan memakai hasilnya. Setelah
+    gagal, pembaruan berikutnya ditunda dengan backoff eksponensial.
+    """
+
+    def __init__(self, registry, folder=SNAPSHOT_DIR, ttl=SNAPSHOT_TTL, open_source=open_source,
+                 max_workers=LOAD_WORKERS, metrics=METRICS):
+        self.registry = registry
+        self.folder = Path(folder)
+        self.ttl = ttl
+        self.open_source = open_source
+        self.max_workers = max_workers
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._generation = 0  # bertambah setiap pembaruan berhasil
+        self._failures = 0
+        self._retry_at = 0.0
+        self._refresher = None
+        self._stop = threading.Event()
+        self._refreshing = False
+        self._prefetching = False
+        self._unavailable = set()  # sheet yang tidak dapat dimuat pada percobaan terakhir
+        self._data = None
+        self._sheet_frames = {}
+        self._meta = {}
+        self._artifact = None
+        self._checked_at = 0.0
+        self._load_from_disk()
+
+    @property
+    def artifact_mode(self):
+        return (self.folder / CURRENT_FILE).exists()
+
+    def _load_from_disk(self):
+        """Memuat snapshot/artefak aktif dari disk ke memori; False bila belum ada."""
+        artifact = resolve_snapshot_dir(self.folder).name
+        with self.metrics.timer('snapshot_load'):
+            snapshot = load_snapshot(self.folder)
+        if snapshot is None:
+            return False
+        final_data, monthly_data, self._meta = snapshot
+        final_data, monthly_data = compact_frame(final_data), compact_frame(monthly_data)
+        with self.metrics.timer('aggregate'):
+            self._data = (final_data, monthly_data, self._build_cube(final_data, monthly_data))
+        self._sheet_frames = split_sheet_frames(final_data, monthly_data, self.registry.keys)
+        self._artifact = artifact
+        self._checked_at = self._meta.get('saved_at', 0.0)
+        return True
+
+    def _build_cube(self, final_data, monthly_data):
+        reconciliation = {
+            key: pd.DataFrame(records, columns=RECONCILE_COLUMNS)
+            for key, records in self._meta.get('reconciliation', {}).items()
+        }
+        return AggregateCube(final_data, monthly_data, data_version(self._meta), reconciliation)
+
+    def get(self):
+        now = time.time()
+        if self._data is not None and now - self._checked_at > self.ttl and now >= self._retry_at:
+            self._refresh_in_background()
+        return self._data
+
+    def _fetch_spreadsheet(self, location):
+        """
+        Mengambil semua sheet registry dari satu spreadsheet.
+        Mengembalikan (versi, {key: baris}); baris None berarti spreadsheet
+        tidak berubah sejak snapshot terakhir sehingga tidak diunduh.
+        """
+        source = self.open_source(location)
+        version = source.version()
+        specs = self.registry.sheets_in(location)
+        # Dilewati hanya bila tidak berubah DAN semua sheet-nya sudah pernah dimuat (bukan muatan parsial)
+        complete = all(spec.key in self._meta.get('sheet_hashes', {}) for spec in specs)
+        if (self._data is not None and complete and version is not None
+                and version == self._meta.get('versions', {}).get(location)):
+            self.metrics.incr('spreadsheet_fetches', result='unchanged')
+            return version, None
+        raw = source.fetch([spec.name for spec in specs])
+        self.metrics.incr('spreadsheet_fetches', result='downloaded')
+        return version, {spec.key: raw[spec.name] for spec in specs if spec.name in raw}
+
+    def refresh(self):
+        """
+        Memuat ulang data secara sinkron dan memperbarui snapshot (single-flight).
+        Bila pembaruan lain selesai selama menunggu giliran, hasilnya langsung dipakai.
+        """
+        generation = self._generation
+        with self._refresh_lock:
+            if self._generation != generation and self._data is not None:
+                self.metrics.incr('refresh_runs', result='shared')
+                return self._data
+            try:
+                data = self._refresh()
+            except Exception:
+                self._record_failure()
+                self.metrics.incr('refresh_runs', result='error')
+                raise
+            self._record_success()
+            self._generation += 1
+            self.metrics.incr('refresh_runs', result='ok')
+            return data
+
+    def _record_failure(self):
+        """Pengambilan gagal: pengambilan berikutnya ditunda dengan jeda eksponensial."""
+        self._failures += 1
+        self._retry_at = time.time() + min(BACKOFF_MAX, REFRESH_RETRY_BASE * 2 ** (self._failures - 1))
+
+    def _record_success(self):
+        self._failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def backing_off(self):
+        """True selama jeda setelah pengambilan gagal; tidak ada unduhan baru yang dimulai."""
+        return time.time() < self._retry_at
+
+    def _refresh(self):
+        if self.artifact_mode:
+            if resolve_snapshot_dir(self.folder).name != self._artifact and not self._load_from_disk():
+                raise ValueError(f"Artefak aktif di {self.folder} tidak dapat dibaca.")
+            self._checked_at = time.time()
+            return self._data
+        old_hashes = self._meta.get('sheet_hashes', {})
+        versions = {}
+        hashes = {}
+        raw_sheets = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # 1. Semua spreadsheet diunduh paralel
+            locations = self.registry.spreadsheets
+            with self.metrics.timer('fetch'):
+                fetched = list(executor.map(self._fetch_spreadsheet, locations))
+            for location, (version, raw) in zip(locations, fetched):
+                versions[location] = version
+                specs = self.registry.sheets_in(location)
+                if raw is None:
+                    hashes.update({spec.key: old_hashes[spec.key] for spec in specs if spec.key in old_hashes})
+                    continue
+                raw_sheets.update(raw)
+                hashes.update({key: hash_sheet_values(values) for key, values in raw.items()})
+
+            changed = [key for key in self.registry.keys if hashes.get(key) != old_hashes.get(key)]
+            meta = {'versions': versions, 'sheet_hashes': hashes,
+                    'reconciliation': self._meta.get('reconciliation', {})}
+            if not changed and self._data is not None:
+                self._meta = save_snapshot_meta(self.folder, meta)
+                self._checked_at = self._meta['saved_at']
+                return self._data
+
+            # 2. Hanya sheet yang berubah diolah ulang, juga paralel
+            specs = [self.registry.get(key) for key in changed if key in raw_sheets]
+            with self.metrics.timer('parse'):
+                parsed = dict(zip([spec.key for spec in specs],
+                                  executor.map(lambda spec: process_sheet(spec, raw_sheets[spec.key]), specs)))
+
+        sheet_frames = dict(self._sheet_frames)
+        for key in changed:
+            if parsed.get(key) is None:
+                sheet_frames.pop(key, None)
+            else:
+                sheet_frames[key] = parsed[key]
+        self._unavailable = {key for key in self.registry.keys
+                             if key not in sheet_frames and self.registry.get(key).total != 'derive'}
+        return self._commit(sheet_frames, meta)
+
+    def _commit(self, sheet_frames, meta):
+        """Menggabungkan frame per sheet, menyimpan snapshot, dan membangun kubus baru."""
+        with self.metrics.timer('reconcile'):
+            sheet_frames, reports = apply_total_sheets(sheet_frames, self.registry)
+        meta['reconciliation'] = {key: report.to_dict('records') for key, report in reports.items()}
+        for key, report in reports.items():
+            if not report.empty:
+                logger.warning("Sheet %s tidak cocok dengan jumlah sheet wilayah pada %d baris.", key, len(report))
+
+        with self.metrics.timer('combine'):
+            final_data, monthly_data = combine_sheet_frames(sheet_frames, self.registry.keys)
+        if final_data.empty:
+            raise ValueError("Tidak ada sheet yang berhasil diolah.")
+        with self.metrics.timer('snapshot_write'):
+            self._meta = save_snapshot(self.folder, final_data, monthly_data, meta)
+        self._checked_at = self._meta['saved_at']
+        with self.metrics.timer('aggregate'):
+            self._data = (final_data, monthly_data, self._build_cube(final_data, monthly_data))
+        # Sesudah _data: siapa pun yang melihat sheet sudah dimuat (needs/has) pasti mendapat kubus barunya
+        self._sheet_frames = sheet_frames
+        return self._data
+
+    # --- Pemuatan per wilayah (lazy) ---
+    @property
+    def missing_keys(self):
+        """Sheet yang dapat diunduh tetapi belum ada di memori (artefak CLI selalu dianggap lengkap)."""
+        return self._pending_keys(spec.key for spec in self.registry.sheets if spec.total != 'derive')
+
+    def _pending_keys(self, keys):
+        if self.artifact_mode:
+            return []
+        return [key for key in keys if key not in self._sheet_frames and key not in self._unavailable]
+
+    def needs(self, key):
+        """True bila menampilkan `key` masih memerlukan unduhan sheet."""
+        return bool(self._pending_keys(self._required_keys([key])))
+
+    def _required_keys(self, keys):
+        """Sheet yang perlu diunduh untuk menampilkan `keys` (total turunan butuh semua sheet wilayah)."""
+        required = []
+        for key in keys:
+            spec = self.registry.get(key)
+            if spec is None:
+                continue
+            required += self.registry.regional_keys if spec.total == 'derive' else [key]
+        return list(dict.fromkeys(required))
+
+    def load_regions(self, keys):
+        """
+        Memuat hanya sheet untuk `keys` yang belum ada di memori, lalu
+        menggabungkannya dengan data yang sudah dimuat (single-flight).
+        Dipakai agar tampilan pertama tidak menunggu semua wilayah. Selama
+        jeda setelah kegagalan (`backing_off`) data yang ada dikembalikan apa adanya
+        (None bila belum ada data sama sekali).
+        """
+        if self.backing_off:
+            return self._data
+        if self._data is None and (self.artifact_mode or not self._pending_keys(self._required_keys(keys))):
+            # Belum ada data dan tidak ada yang bisa dimuat per wilayah (artefak CLI, atau sheet
+            # `keys` tidak dapat diolah): pemuatan penuh, sheet yang gagal dilewati
+            return self.refresh()
+        with self._refresh_lock:
+            missing = self._pending_keys(self._required_keys(keys))
+            if not missing or self.backing_off:
+                return self._data
+            try:
+                data = self._load_keys(missing)
+            except Exception:
+                self._record_failure()
+                self.metrics.incr('region_loads', result='error')
+                raise
+            self._record_success()
+            self.metrics.incr('region_loads', result='ok')
+            return data
+
+    def _load_keys(self, keys):
+        by_location = {}
+        for key in keys:
+            spec = self.registry.get(key)
+            by_location.setdefault(spec.spreadsheet, []).append(spec)
+
+        def fetch(location):
+            specs = by_location[location]
+            raw = self.open_source(location).fetch([spec.name for spec in specs])
+            self.metrics.incr('spreadsheet_fetches', result='partial')
+            return {spec.key: raw[spec.name] for spec in specs if spec.name in raw}
+
+        raw_sheets = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            with self.metrics.timer('fetch'):
+                for raw in executor.map(fetch, by_location):
+                    raw_sheets.update(raw)
+        with self.metrics.timer('parse'):
+            parsed = parse_sheets(raw_sheets, self.registry, self.max_workers)
+
+        sheet_frames = dict(self._sheet_frames)
+        sheet_frames.update({key: frames for key, frames in parsed.items() if frames is not None})
+        # Sheet yang tidak ada/gagal diolah tidak dicoba lagi sampai pembaruan penuh berikutnya
+        self._unavailable.update(key for key in keys if key not in sheet_frames)
+        # Versi spreadsheet tidak diperbarui: pembaruan penuh berikutnya tetap memeriksa semua sheet
+        meta = {
+            'versions': self._meta.get('versions', {}),
+            'sheet_hashes': dict(self._meta.get('sheet_hashes', {}),
+                                 **{key: hash_sheet_values(values) for key, values in raw_sheets.items()}),
+            'reconciliation': self._meta.get('reconciliation', {}),
+        }
+        return self._commit(sheet_frames, meta)
+
+    def prefetch_in_background(self):
+        """Memuat sheet yang belum ada di thread latar belakang (sekali jalan per waktu)."""
+        with self._lock:
+            if self._prefetching or self.backing_off or not self.missing_keys:
+                return
+            self._prefetching = True
+        threading.Thread(target=self._background_prefetch, name='dasbor-prefetch', daemon=True).start()
+
+    def _background_prefetch(self):
+        try:
+            self.load_regions(self.missing_keys)
+        except Exception:
+            logger.exception("Prefetch wilayah di latar belakang gagal; dimuat saat dipilih.")
+        finally:
+            with self._lock:
+                self._prefetching = False
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Pembaruan snapshot di latar belakang gagal; data lama tetap dipakai.")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def start_refresher(self, ahead=REFRESH_AHEAD):
+        """
+        Menjalankan thread latar belakang (sekali per store) yang memperbarui
+        data setelah `ahead` × TTL, sehingga sesi hampir tidak pernah melihat
+        data basi. Setelah gagal, menunggu sesuai backoff sebelum mencoba lagi.
+        """
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(target=self._refresher_loop, args=(ahead,),
+                                               name='dasbor-refresher', daemon=True)
+        self._refresher.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+
+    def _refresher_loop(self, ahead):
+        while True:
+            if self._data is None:
+                # Pemuatan pertama ditangani pemanggil (per wilayah); refresher menunggu data pertama
+                if self._stop.wait(1.0):
+                    return
+                continue
+            due = max(self._checked_at + self.ttl * ahead, self._retry_at)
+            if self._stop.wait(max(0.0, due - time.time())):
+                return
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Refresher latar belakang gagal; dicoba lagi setelah %.0f detik.",
+                                 max(0.0, self._retry_at - time.time()))
+
+
+# --- EKSPOR DATA (DITULIS BERTAHAP PER CHUNK) ---
+EXPORT_CHUNK_ROWS = 50_000
+EXCEL_MAX_ROWS = 1_048_575  # batas baris lembar Excel, di luar header
+
+
+def iter_chunks(frame, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def write_csv(frame, f, chunk_rows=EXPORT_CHUNK_ROWS):
+    f.write(frame.iloc[:0].to_csv(index=False).encode('utf-8'))
+    for chunk in iter_chunks(frame, chunk_rows):
+        f.write(chunk.to_csv(index=False, header=False).encode('utf-8'))
+
+
+def write_parquet(frame, f, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Satu row group per chunk lewat pyarrow.parquet.ParquetWriter."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(f, schema) as writer:
+        for chunk in iter_chunks(frame, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def write_xlsx(frame, f, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Workbook mode write-only openpyxl: baris dialirkan ke disk, bukan disimpan di memori."""
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise RuntimeError("Ekspor XLSX membutuhkan paket openpyxl (pip install openpyxl).") from e
+    if len(frame) > EXCEL_MAX_ROWS:
+        raise ValueError(f"Data ({len(frame):,} baris) melebihi batas Excel; gunakan CSV atau Parquet.")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Data")
+    sheet.append(list(frame.columns))
+    for chunk in iter_chunks(frame, chunk_rows):
+        for row in chunk.astype(object).itertuples(index=False):
+            sheet.append(list(row))
+    workbook.save(f)
+
+
+# format -> (ekstensi, MIME, penulis)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv', write_csv),
+    'XLSX': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', write_xlsx),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet', write_parquet),
+}
+
+
+def export_frame(frame, fmt, f, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Menulis `frame` ke file biner `f` dalam format EXPORT_FORMATS[fmt], per chunk."""
+    EXPORT_FORMATS[fmt][2](frame, f, chunk_rows)
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Menyiapkan artefak data dasbor secara offline.")
+    parser.add_argument('--registry', default=REGISTRY_PATH, help="berkas registry.toml")
+    parser.add_argument('--source', help="folder CSV atau berkas .xlsx pengganti semua spreadsheet di registry")
+    parser.add_argument('--credentials', help="berkas JSON service account Google (default: GOOGLE_APPLICATION_CREDENTIALS)")
+    parser.add_argument('--output', default=SNAPSHOT_DIR, help="folder artefak yang dibaca dasbor (DASBOR_SNAPSHOT_DIR)")
+    parser.add_argument('--keep', type=int, default=ARTIFACT_KEEP, help="jumlah artefak yang disimpan")
+    parser.add_argument('--workers', type=int, default=LOAD_WORKERS, help="thread unduh & olah paralel")
+    parser.add_argument('--force', action='store_true', help="tetap menerbitkan artefak walau data tidak berubah")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    registry = Registry.from_file(args.registry)
+    credentials = json.loads(Path(args.credentials).read_text()) if args.credentials else None
+    if args.source:
+        opener = lambda location: open_source(args.source)
+    else:
+        opener = lambda location: open_source(location, credentials)
+
+    started = time.perf_counter()
+    versions, raw_sheets = fetch_registry(registry, opener, max_workers=args.workers)
+    sheet_frames, reports = apply_total_sheets(parse_sheets(raw_sheets, registry, args.workers), registry)
+    final_data, monthly_data = combine_sheet_frames(sheet_frames, registry.keys)
+    if final_data.empty:
+        logger.error("Tidak ada sheet yang berhasil diolah.")
+        return 1
+    for key, report in reports.items():
+        if not report.empty:
+            logger.warning("Sheet %s tidak cocok dengan jumlah sheet wilayah pada %d baris.", key, len(report))
+
+    meta = {'versions': versions,
+            'sheet_hashes': {key: hash_sheet_values(values) for key, values in raw_sheets.items()},
+            'reconciliation': {key: report.to_dict('records') for key, report in reports.items()}}
+    current = load_snapshot(args.output)
+    if not args.force and current is not None and data_version(current[2]) == data_version(meta):
+        logger.info("Data tidak berubah (%s); artefak tidak diterbitkan.", data_version(meta)[:8])
+        return 0
+
+    name = publish_artifact(args.output, final_data, monthly_data, meta, keep=args.keep)
+    logger.info("Artefak %s diterbitkan: %d baris, %d baris bulanan (%.1f detik).",
+                name, len(final_data), len(monthly_data), time.perf_counter() - started)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
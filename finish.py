@@ -1,12 +1,26 @@
 import streamlit as st
 import pandas as pd
-import gspread
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import base64
+from io import BytesIO
 from pathlib import Path
+import functools
+import logging
+import math
+import tempfile
 import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from PIL import Image
+
+from etl import (BULAN, EXPORT_FORMATS, METRICS, REGISTRY_PATH, SNAPSHOT_DIR, Registry, SnapshotStore,
+                 export_frame, open_source)
+
+logger = logging.getLogger(__name__)
 
 # --- Konfigurasi Halaman Streamlit ---
 st.set_page_config(
@@ -15,16 +29,102 @@ st.set_page_config(
     layout="wide"
 )
 
-# --- FUNGSI UNTUK GAMBAR (DEFINISI YANG HILANG) ---
-def img_to_base64(img_path):
-    """Mengubah file gambar menjadi string base64."""
+# --- ASET STATIS (LOGO & CSS) ---
+# Faktor skala logo agar tetap tajam di layar HiDPI.
+LOGO_SCALE = 2
+
+
+@st.cache_resource
+def img_to_base64(img_path, width=None):
+    """
+    Mengubah file gambar menjadi string base64, diperkecil ke `width` piksel
+    (× LOGO_SCALE). Hanya dihitung sekali per proses.
+    """
     path = Path(img_path)
     if not path.is_file():
         # Jika file tidak ditemukan, kembalikan None agar tidak error
-        st.error(f"File logo tidak ditemukan di: {img_path}")
         return None
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+    with Image.open(path) as img:
+        if width and img.width > width * LOGO_SCALE:
+            height = round(img.height * width * LOGO_SCALE / img.width)
+            img = img.resize((width * LOGO_SCALE, height), Image.LANCZOS)
+        buffer = BytesIO()
+        img.save(buffer, format="PNG", optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+@st.cache_resource
+def build_stylesheet(margin_atas='4rem', margin_bawah='5rem'):
+    """Seluruh CSS aplikasi dalam satu blok <style>, disusun sekali per proses."""
+    return f"""<style>
+    /* Reset padding utama */
+    div.block-container {{
+        padding-top: {margin_atas};
+        padding-bottom: {margin_bawah};
+        padding-left: 2rem;
+        padding-right: 2rem;
+    }}
+
+    /* Flex container untuk header */
+    [data-testid="stHorizontalBlock"] {{
+        align-items: flex-end !important;
+    }}
+
+    /* Kolom logo kiri */
+    [data-testid="column"]:nth-of-type(1) {{
+        align-self: flex-end !important;
+        padding-bottom: 0 !important;
+    }}
+
+    /* Reset margin gambar */
+    .stImage img {{
+        margin-bottom: 0 !important;
+        vertical-align: bottom !important;
+    }}
+
+    /* Container logo kanan */
+    .logo-kanan-container {{
+        display: flex !important;
+        gap: 8px !important;
+        align-items: flex-end !important;
+    }}
+
+    /* Judul utama dengan animasi */
+    @keyframes fadeIn {{
+        from {{ opacity: 0; transform: translateY(-20px); }}
+        to {{ opacity: 1; transform: translateY(0); }}
+    }}
+    .title-box {{
+        background: linear-gradient(135deg, #005FAC, #005FAC);
+        color: white;
+        padding: 1.5rem;
+        border-radius: 15px;
+        box-shadow: 0 10px 20px rgba(0,0,0,0.2);
+        text-align: center;
+        margin-bottom: 2rem;
+        animation: fadeIn 1s ease-out;
+    }}
+    .title-box h1 {{
+        margin-bottom: 0.5rem;
+        font-size: 2.2rem;
+    }}
+    .title-box h2 {{
+        margin-top: 0;
+        font-size: 1.5rem;
+        opacity: 0.9;
+    }}
+
+    /* Tab dengan lebar penuh */
+    .stTabs [data-baseweb="tab-list"] {{ display: flex; width: 100%; gap: 2px; }}
+    .stTabs [data-baseweb="tab"] {{
+        flex-grow: 1; text-align: center; height: 50px;
+        white-space: pre-wrap; background-color: #F0F2F6;
+        border-radius: 4px 4px 0px 0px; padding: 10px;
+        font-size: 16px; font-weight: 600;
+    }}
+    .stTabs [aria-selected="true"] {{ background-color: #FFFFFF; }}
+</style>"""
+
 
 def tampilkan_header(lebar_logo_kiri=550, lebar_intress=155, lebar_djpb=60, margin_atas='4rem', margin_bawah='5rem'):
     """
@@ -33,45 +133,8 @@ def tampilkan_header(lebar_logo_kiri=550, lebar_intress=155, lebar_djpb=60, marg
     - Logo kanan rata kanan
     - Presisi tinggi dalam penempatan
     """
-    # CSS untuk presisi layout
-    st.markdown(
-        f"""
-        <style>
-            /* Reset padding utama */
-            div.block-container {{
-                padding-top: {margin_atas};
-                padding-bottom: {margin_bawah};
-                padding-left: 2rem;
-                padding-right: 2rem;
-            }}
-            
-            /* Flex container untuk header */
-            [data-testid="stHorizontalBlock"] {{
-                align-items: flex-end !important;
-            }}
-            
-            /* Kolom logo kiri */
-            [data-testid="column"]:nth-of-type(1) {{
-                align-self: flex-end !important;
-                padding-bottom: 0 !important;
-            }}
-            
-            /* Reset margin gambar */
-            .stImage img {{
-                margin-bottom: 0 !important;
-                vertical-align: bottom !important;
-            }}
-            
-            /* Container logo kanan */
-            .logo-kanan-container {{
-                display: flex !important;
-                gap: 8px !important;
-                align-items: flex-end !important;
-            }}
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
+    # Satu stylesheet untuk seluruh aplikasi
+    st.markdown(build_stylesheet(margin_atas, margin_bawah), unsafe_allow_html=True)
 
     # Layout kolom
     col1, col2, col3 = st.columns([2.5, 5, 2])
@@ -81,9 +144,12 @@ def tampilkan_header(lebar_logo_kiri=550, lebar_intress=155, lebar_djpb=60, marg
         intress_path = "logo/INTRESS.png"
         djpb_path = "logo/DJPb.png"
 
-        # Encode gambar ke base64
-        intress_b64 = img_to_base64(intress_path)
-        djpb_b64 = img_to_base64(djpb_path)
+        # Logo sudah diperkecil & di-encode sekali saat proses dimulai
+        intress_b64 = img_to_base64(intress_path, lebar_intress)
+        djpb_b64 = img_to_base64(djpb_path, lebar_djpb)
+        for path, b64 in ((intress_path, intress_b64), (djpb_path, djpb_b64)):
+            if b64 is None:
+                st.error(f"File logo tidak ditemukan di: {path}")
 
         # Hanya tampilkan jika gambar berhasil di-load
         if intress_b64 and djpb_b64:
@@ -94,89 +160,346 @@ def tampilkan_header(lebar_logo_kiri=550, lebar_intress=155, lebar_djpb=60, marg
             </div>
             """, unsafe_allow_html=True)
 
-# --- FUNGSI MEMUAT & MENGOLAH DATA (DENGAN PERBAIKAN) ---
-@st.cache_data(ttl=300, show_spinner="Memuat data terbaru...")
-def load_and_process_data(sheet_url):
+# --- DIAGNOSTIK (WAKTU PER FASE & METRIK) ---
+METRICS_FILE = Path(os.environ.get("DASBOR_METRICS_FILE", SNAPSHOT_DIR / "metrics.prom"))
+METRICS_WRITE_INTERVAL = 1.0  # detik; rerun fragment beruntun tidak menulis berkas berkali-kali
+_metrics_written_at = 0.0
+
+
+@contextmanager
+def fase(nama):
+    """
+    Mengukur satu fase: kumulatif di METRICS dan per rerun di session_state.
+    Selama fase berjalan, prefetch latar belakang ditahan.
+    """
+    start = time.perf_counter()
+    try:
+        with get_prefetcher().foreground():
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        METRICS.observe(nama, elapsed)
+        st.session_state.setdefault('_timings', {})[nama] = elapsed
+
+
+def diukur(nama):
+    """Dekorator `fase` untuk renderer show_*; berkas metrik ikut diperbarui."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with fase(nama):
+                result = func(*args, **kwargs)
+            write_metrics()
+            return result
+        return wrapper
+    return decorator
+
+
+def write_metrics(force=False):
+    """Menulis METRICS ke berkas teks Prometheus (dibatasi paling sering sekali per interval)."""
+    global _metrics_written_at
+    now = time.monotonic()
+    if not force and now - _metrics_written_at < METRICS_WRITE_INTERVAL:
+        return
+    _metrics_written_at = now
+    try:
+        METRICS.write_textfile(METRICS_FILE)
+    except OSError:
+        logger.warning("Gagal menulis berkas metrik %s", METRICS_FILE, exc_info=True)
+
+
+def diagnostik_aktif():
+    """
+    Panel diagnostik hanya untuk admin: diaktifkan lewat DASBOR_DIAGNOSTIK=1 di
+    server, bukan parameter URL yang bisa ditambahkan siapa pun.
+    """
+    return os.environ.get("DASBOR_DIAGNOSTIK") == "1"
+
+
+def show_diagnostics():
+    with st.sidebar.expander("🛠️ Diagnostik", expanded=False):
+        timings = st.session_state.get('_timings', {})
+        st.caption("Rerun terakhir")
+        st.dataframe(
+            pd.DataFrame({'Fase': list(timings), 'ms': [t * 1000 for t in timings.values()]}),
+            column_config={"ms": st.column_config.NumberColumn(format="%.1f")},
+            hide_index=True, use_container_width=True
+        )
+
+        st.caption("Kumulatif proses (termasuk pipeline data)")
+        phases = METRICS.phases()
+        st.dataframe(
+            pd.DataFrame({
+                'Fase': list(phases),
+                'Jumlah': [count for count, _, _, _ in phases.values()],
+                'Rata-rata ms': [total / count * 1000 for count, total, _, _ in phases.values()],
+                'Terakhir ms': [last * 1000 for _, _, last, _ in phases.values()],
+            }),
+            column_config={
+                "Rata-rata ms": st.column_config.NumberColumn(format="%.1f"),
+                "Terakhir ms": st.column_config.NumberColumn(format="%.1f"),
+            },
+            hide_index=True, use_container_width=True
+        )
+
+        st.caption("Counter")
+        counters = METRICS.counters()
+        st.dataframe(
+            pd.DataFrame({
+                'Counter': [name + ''.join(f" {k}={v}" for k, v in labels) for name, labels in counters],
+                'Nilai': list(counters.values()),
+            }),
+            hide_index=True, use_container_width=True
+        )
+        st.caption(f"Berkas metrik: `{METRICS_FILE}`")
+
+
+# --- DATA (PIPELINE ADA DI etl.py, DI SINI HANYA PEREKAT STREAMLIT) ---
+@st.cache_resource
+def get_registry(path=REGISTRY_PATH):
+    return Registry.from_file(path)
+
+
+def open_source_with_secrets(location):
+    """etl.open_source dengan kredensial Google dari Streamlit Secrets."""
+    if Path(location).exists():
+        return open_source(location)
+    return open_source(location, credentials=st.secrets["gcp_service_account"])
+
+
+def load_and_process_data(region=None, registry_path=REGISTRY_PATH):
+    """
+    Mengembalikan (final_data, monthly_data, cube) dari snapshot di disk.
+    Bila wilayah `region` belum dimuat, hanya sheet wilayah itu yang diunduh
+    (tampilan pertama tidak menunggu semua wilayah); wilayah lain dimuat di
+    latar belakang. Data lama disajikan sambil diperbarui di latar belakang.
+    """
+    store = get_snapshot_store(registry_path)
+    loaded = region is None or not store.needs(region)  # diperiksa sebelum get(), lihat SnapshotStore._commit
+    data = store.get()
+    if data is not None and loaded:
+        METRICS.incr('cache_requests', cache='snapshot', result='hit')
+        store.prefetch_in_background()
+        return data
+
+    METRICS.incr('cache_requests', cache='snapshot', result='miss')
+    empty = (pd.DataFrame(), pd.DataFrame(), None)
+    if store.backing_off:
+        # Pengambilan terakhir gagal: tidak mengunduh ulang di setiap rerun sampai jeda habis
+        return data if data is not None else empty
     try:
-        # Menggunakan kredensial dari Streamlit Secrets
-        gc = gspread.service_account_from_dict(st.secrets["gcp_service_account"])
-        spreadsheet = gc.open_by_url(sheet_url)
+        if region is None:
+            with st.spinner("Memuat data terbaru..."):
+                data = store.refresh()
+        else:
+            with st.spinner(f"Memuat data {get_registry(registry_path).label(region)}..."):
+                data = store.load_regions([region])
     except Exception as e:
         st.error(f"Gagal terhubung ke Google Sheet. Error: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+        return empty
+    store.prefetch_in_background()
+    return data if data is not None else empty
 
-    sheet_names = ['GRAND TOTAL', 'KAB ACEH UTARA', 'KAB BIREUN', 'LHOKSEUMAWE']
-    all_data_list = []
-    monthly_data_list = []
-    expected_cols = {
-        'GRAND TOTAL': ['NO', 'Nama KPPN', 'KDAKUN', 'NMAKUN', 'PROGRAM PENGELOLAAN', 'TAHUN', 'PAGU', 'REALISASI JANUARI', 'REALISASI FEBRUARI', 'REALISASI MARET', 'REALISASI APRIL', 'REALISASI MEI', 'REALISASI JUNI', 'REALISASI JULI', 'REALISASI AGUSTUS', 'REALISASI SEPTEMBER', 'REALISASI OKTOBER', 'REALISASI NOVEMBER', 'REALISASI DESEMBER', 'Total', 'PERSENTASE', 'Selisih'],
-        'regional': ['NO', 'NMKABKOTA', 'KDAKUN', 'NMAKUN', 'PROGRAM PENGELOLAAN', 'TAHUN', 'PAGU', 'REALISASI JANUARI', 'REALISASI FEBRUARI', 'REALISASI MARET', 'REALISASI APRIL', 'REALISASI MEI', 'REALISASI JUNI', 'REALISASI JULI', 'REALISASI AGUSTUS', 'REALISASI SEPTEMBER', 'REALISASI OKTOBER', 'REALISASI NOVEMBER', 'REALISASI DESEMBER', 'Total', 'PERSENTASE']
-    }
 
-    for name in sheet_names:
-        try:
-            worksheet = spreadsheet.worksheet(name)
-            rows = worksheet.get_all_values()[1:]
-            if not rows:
-                continue
-            df_raw = pd.DataFrame(rows)
-            col_map = expected_cols['GRAND TOTAL'] if name == 'GRAND TOTAL' else expected_cols['regional']
-            if len(df_raw.columns) != len(col_map):
-                continue
-            df_raw.columns = col_map
-            df_raw.rename(columns={'NMAKUN': 'Jenis Belanja'}, inplace=True)
-
-            # --- PERUBAHAN UTAMA DI SINI ---
-            # Kondisi "if name != 'GRAND TOTAL':" dihapus agar semua sheet diproses untuk data bulanan.
-            monthly_cols = ['PROGRAM PENGELOLAAN', 'TAHUN'] + [col for col in df_raw.columns if 'REALISASI' in col and 'Total' not in col]
-            # Memastikan semua kolom yang diperlukan ada sebelum memproses
-            if all(col in df_raw.columns for col in monthly_cols):
-                monthly_df = df_raw[monthly_cols].copy()
-                monthly_df['Wilayah'] = name
-                monthly_data_list.append(monthly_df)
-            # --- AKHIR PERUBAHAN ---
-
-            if 'PROGRAM PENGELOLAAN' in df_raw.columns:
-                df_raw['PROGRAM PENGELOLAAN'] = df_raw['PROGRAM PENGELOLAAN'].str.strip().str.upper()
-            df_raw = df_raw[df_raw['Jenis Belanja'].astype(str).str.strip() != ''].copy()
-            cols_to_keep = ['Jenis Belanja', 'PROGRAM PENGELOLAAN', 'TAHUN', 'PAGU', 'Total']
-            df_processed = df_raw[cols_to_keep].copy()
-            df_processed.rename(columns={'PAGU': 'Anggaran', 'Total': 'Realisasi'}, inplace=True)
-            df_processed['Wilayah'] = name
-            all_data_list.append(df_processed)
-        except Exception:
-            continue
+@st.cache_resource
+def get_snapshot_store(registry_path=REGISTRY_PATH):
+    store = SnapshotStore(get_registry(registry_path), open_source=open_source_with_secrets)
+    # Satu refresher per proses memperbarui data sebelum TTL habis
+    store.start_refresher()
+    return store
+
 
-    if not all_data_list:
-        return pd.DataFrame(), pd.DataFrame()
+# --- CACHE GRAFIK PLOTLY (LRU TERBATAS) ---
+FIGURE_CACHE_SIZE = 128
+PREFETCH_MAX_FIGURES = 32  # anggaran memori prefetch: figure spekulatif di cache
 
-    def clean_numeric(value):
-        if isinstance(value, str):
-            cleaned = value.replace("Rp", "").replace(",", "").replace(".", "").strip()
-            return float(cleaned) if cleaned.isdigit() else 0.0
-        return float(value) if pd.notna(value) else 0.0
 
-    # Data utama
-    final_data = pd.concat(all_data_list, ignore_index=True)
-    for col in ['Anggaran', 'Realisasi']:
-        final_data[col] = pd.to_numeric(final_data[col].apply(clean_numeric), errors='coerce')
+class FigureCache:
+    """
+    Cache LRU berukuran tetap untuk figure Plotly, dipakai bersama semua sesi.
+    Kunci = kombinasi filter; seluruh isi dibuang ketika versi data berubah.
+    Figure spekulatif (dari prefetch) hanya mengisi slot kosong, paling banyak
+    `max_speculative`, dan menjadi yang pertama dibuang.
+    """
 
-    final_data.dropna(subset=['TAHUN', 'Anggaran', 'Realisasi'], inplace=True)
-    final_data['TAHUN'] = final_data['TAHUN'].astype(int)
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE, max_speculative=PREFETCH_MAX_FIGURES):
+        self.maxsize = maxsize
+        self.max_speculative = max_speculative
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._speculative = set()  # kunci hasil prefetch yang belum pernah diminta
+        self._version = None
+
+    def _check_version(self, data_version):
+        if data_version != self._version:
+            self._entries.clear()
+            self._speculative.clear()
+            self._version = data_version
+
+    def get_or_build(self, data_version, key, build):
+        with self._lock:
+            self._check_version(data_version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                METRICS.incr('cache_requests', cache='figure', result='hit')
+                if key in self._speculative:
+                    self._speculative.discard(key)
+                    METRICS.incr('prefetch_figures', result='used')
+                return self._entries[key]
+
+        METRICS.incr('cache_requests', cache='figure', result='miss')
+        fig = build()
+
+        with self._lock:
+            if data_version == self._version:
+                self._entries[key] = fig
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._speculative.discard(evicted)
+        return fig
+
+    def wants(self, data_version, key):
+        """True bila figure `key` belum ada dan masih ada anggaran slot untuk prefetch."""
+        with self._lock:
+            self._check_version(data_version)
+            return key not in self._entries and self._has_room()
+
+    def _has_room(self):
+        return len(self._entries) < self.maxsize and len(self._speculative) < self.max_speculative
+
+    def put_speculative(self, data_version, key, fig):
+        """Menyimpan figure hasil prefetch tanpa pernah menggusur figure yang diminta pengguna."""
+        with self._lock:
+            if data_version != self._version or key in self._entries or not self._has_room():
+                return False
+            self._entries[key] = fig
+            self._entries.move_to_end(key, last=False)  # ujung LRU: dibuang lebih dulu
+            self._speculative.add(key)
+            return True
+
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+
+def cached_figure(data_version, key, build):
+    return get_figure_cache().get_or_build(data_version, key, build)
+
+
+# --- PREFETCH SPEKULATIF (KOMBINASI FILTER BERIKUTNYA) ---
+PREFETCH_QUEUE_SIZE = 24  # antrean terbatas; pekerjaan terlama dibuang lebih dulu
+PREFETCH_CPU_SHARE = 0.25  # porsi maksimum satu inti CPU untuk prefetch
+
+
+class FigurePrefetcher:
+    """
+    Satu thread latar belakang yang membangun figure untuk kombinasi filter
+    yang kemungkinan dipilih berikutnya (tahun/wilayah bersebelahan) ke
+    FigureCache. Anggaran:
+    - CPU: berhenti selama ada rerun yang sedang dirender (`foreground`), dan
+      setelah setiap figure tidur sehingga pemakaian ≤ `cpu_share` satu inti;
+    - memori: hanya slot kosong FigureCache, maksimal `max_speculative` figure.
+    """
 
-    # Data bulanan
-    monthly_data = pd.concat(monthly_data_list, ignore_index=True) if monthly_data_list else pd.DataFrame()
-    if not monthly_data.empty:
-        bulan_cols = [col for col in monthly_data.columns if 'REALISASI' in col]
-        for col in bulan_cols:
-            monthly_data[col] = pd.to_numeric(monthly_data[col].apply(clean_numeric), errors='coerce')
-        monthly_data['TAHUN'] = monthly_data['TAHUN'].astype(int)
+    def __init__(self, cache, cpu_share=PREFETCH_CPU_SHARE, queue_size=PREFETCH_QUEUE_SIZE):
+        self.cache = cache
+        self.cpu_share = cpu_share
+        self._cond = threading.Condition()
+        self._jobs = OrderedDict()  # (versi, kunci) -> build, terbaru di akhir
+        self._queue_size = queue_size
+        self._foreground = 0
+        self._thread = None
+
+    @contextmanager
+    def foreground(self):
+        """Menandai rerun yang sedang berjalan; prefetch menunggu sampai selesai."""
+        with self._cond:
+            self._foreground += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._foreground -= 1
+                self._cond.notify()
+
+    def submit(self, data_version, jobs):
+        """Menambahkan [(kunci, build)] ke antrean; pekerjaan terbaru dikerjakan lebih dulu."""
+        with self._cond:
+            for key, build in jobs:
+                if not self.cache.wants(data_version, key):
+                    continue
+                self._jobs.pop((data_version, key), None)
+                self._jobs[(data_version, key)] = build
+            while len(self._jobs) > self._queue_size:
+                self._jobs.popitem(last=False)
+            if self._jobs and self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='dasbor-figure-prefetch', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _next_job(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._jobs and not self._foreground)
+            return self._jobs.popitem(last=True)
+
+    def _loop(self):
+        while True:
+            (data_version, key), build = self._next_job()
+            if not self.cache.wants(data_version, key):
+                METRICS.incr('prefetch_figures', result='skipped')
+                continue
+            start = time.thread_time()
+            try:
+                with METRICS.timer('prefetch'):
+                    fig = build()
+            except Exception:
+                logger.warning("Prefetch figure %s gagal", key, exc_info=True)
+                METRICS.incr('prefetch_figures', result='error')
+                continue
+            stored = self.cache.put_speculative(data_version, key, fig)
+            METRICS.incr('prefetch_figures', result='built' if stored else 'skipped')
+            cpu = time.thread_time() - start
+            time.sleep(cpu * (1 - self.cpu_share) / self.cpu_share)
+
+
+@st.cache_resource
+def get_prefetcher():
+    return FigurePrefetcher(get_figure_cache())
+
+
+def adjacent_combinations(cube, regions, selected_region, selected_year):
+    """Kombinasi (wilayah, tahun) bersebelahan: tahun sebelum/sesudah dulu, lalu wilayah sebelah."""
+    combos = []
+    years = list(cube.years)
+    if selected_year in years:
+        i = years.index(selected_year)
+        combos += [(selected_region, years[j]) for j in (i + 1, i - 1) if 0 <= j < len(years)]
+    regions = [region for region in regions if region in cube.regions]
+    if selected_region in regions:
+        i = regions.index(selected_region)
+        combos += [(regions[j], selected_year) for j in (i + 1, i - 1) if 0 <= j < len(regions)]
+    return combos
+
+
+def prefetch_adjacent_views(cube, regions, selected_region, selected_year):
+    """Pie program dan sub-detail program pertama (pilihan bawaan) untuk kombinasi bersebelahan."""
+    jobs = []
+    for region, year in adjacent_combinations(cube, regions, selected_region, selected_year):
+        program_summary = cube.program_summary(region, year)
+        if program_summary.empty:
+            continue
+        jobs.append((('pie', region, year), functools.partial(build_pie_chart, program_summary)))
+        program = program_summary['PROGRAM PENGELOLAAN'].iloc[0]
+        jobs.append((('sub_detail', region, year, program),
+                     functools.partial(build_sub_detail_pie, cube.jenis_summary(region, year, program), program)))
+    # Diserahkan terbalik: kombinasi terdekat dikerjakan lebih dulu (LIFO)
+    get_prefetcher().submit(cube.version, jobs[::-1])
 
-    return final_data, monthly_data
 
 # --- FUNGSI VISUALISASI (Tidak Perlu Diubah) ---
-def show_pie_chart(data):
-    st.subheader("⏳ Distribusi Anggaran per Program")
+def build_pie_chart(data):
     # Palet warna DJPB yang diurutkan berdasarkan prioritas (besar ke kecil)
     djp_colors = [
         '#005FAC',  # Biru DJPB (utama untuk yang terbesar)
@@ -222,11 +545,55 @@ def show_pie_chart(data):
             x=0.5
         )
     )
+    return fig
+
+@diukur('render_pie')
+def show_pie_chart(data, selected_year, selected_region, data_version):
+    st.subheader("⏳ Distribusi Anggaran per Program")
+    fig = cached_figure(data_version, ('pie', selected_region, selected_year), lambda: build_pie_chart(data))
     st.plotly_chart(fig, use_container_width=True)
 
-def show_sub_detail_pie(data, monthly_data, selected_year, selected_region):
+def build_sub_detail_pie(sub_summary, selected_program):
+    # Palet warna untuk sub-detail (diurutkan sesuai prioritas DJPB)
+    sub_colors = [        
+        '#005FAC',  # Biru DJPB (utama untuk yang terbesar)
+        '#FFD700',  # Kuning emas (untuk kedua terbesar)
+        '#ced4da',  # Abu-abu (untuk ketiga terbesar)
+        '#8ecae6',  # biru muda
+        '#caf0f8',  # biru pastel
+        '#f8edeb',  # abu muda
+        '#ecf39e',  # kuning pastel
+        '#03045e',  # donker
+    ]
+    
+    sub_fig = px.pie(
+        sub_summary,
+        names='Jenis Belanja',
+        values='Anggaran',
+        color='Jenis Belanja',
+        color_discrete_sequence=sub_colors,
+        hole=0.4,
+        height=500
+    )
+    sub_fig.update_traces(
+        hovertemplate="<b>%{label}</b><br>Anggaran: Rp%{value:,.0f}<br><extra></extra>",
+        textposition='inside',
+        textinfo='percent',
+        textfont_size=14
+    )
+    sub_fig.update_layout(
+        legend=dict(orientation="h", yanchor="bottom", y=-0.35, xanchor="center", x=0.5),
+        margin=dict(l=20, r=20, t=40, b=100),
+        title=f"Distribusi Anggaran per Jenis Belanja<br><sup>Program: {selected_program}</sup>"
+    )
+    return sub_fig
+
+# Fragment: widget di dalamnya hanya menjalankan ulang fungsi ini, bukan seluruh main().
+@st.fragment
+@diukur('render_sub_detail')
+def show_sub_detail_pie(cube, selected_year, selected_region):
     st.subheader("📂 Sub-detail Jenis Belanja")
-    unique_programs = data['PROGRAM PENGELOLAAN'].unique()
+    unique_programs = cube.program_summary(selected_region, selected_year)['PROGRAM PENGELOLAAN'].tolist()
     if len(unique_programs) == 0:
         st.warning("Tidak ada program untuk ditampilkan.")
         return
@@ -234,154 +601,69 @@ def show_sub_detail_pie(data, monthly_data, selected_year, selected_region):
     selected_program = st.selectbox("🔎 Pilih Program Pengelolaan:", options=unique_programs)
 
     if selected_program:
-        sub_df = data[data['PROGRAM PENGELOLAAN'] == selected_program]
-        sub_summary = sub_df.groupby('Jenis Belanja')[['Anggaran', 'Realisasi']].sum().reset_index()
-        sub_summary['Persentase'] = np.where(sub_summary['Anggaran'] > 0, (sub_summary['Realisasi'] / sub_summary['Anggaran']) * 100, 0)
+        # Sudah terurut dari terbesar ke terkecil di dalam kubus agregat
+        sub_summary = cube.jenis_summary(selected_region, selected_year, selected_program)
         
-        # Urutkan dari terbesar ke terkecil
-        sub_summary = sub_summary.sort_values('Anggaran', ascending=False)
-        
-        # Palet warna untuk sub-detail (diurutkan sesuai prioritas DJPB)
-        sub_colors = [        
-            '#005FAC',  # Biru DJPB (utama untuk yang terbesar)
-            '#FFD700',  # Kuning emas (untuk kedua terbesar)
-            '#ced4da',  # Abu-abu (untuk ketiga terbesar)
-            '#8ecae6',  # biru muda
-            '#caf0f8',  # biru pastel
-            '#f8edeb',  # abu muda
-            '#ecf39e',  # kuning pastel
-            '#03045e',  # donker
-        ]
-        
-        sub_fig = px.pie(
-            sub_summary,
-            names='Jenis Belanja',
-            values='Anggaran',
-            color='Jenis Belanja',
-            color_discrete_sequence=sub_colors,
-            hole=0.4,
-            height=500
-        )
-        sub_fig.update_traces(
-            hovertemplate="<b>%{label}</b><br>Anggaran: Rp%{value:,.0f}<br><extra></extra>",
-            textposition='inside',
-            textinfo='percent',
-            textfont_size=14
-        )
-        sub_fig.update_layout(
-            legend=dict(orientation="h", yanchor="bottom", y=-0.35, xanchor="center", x=0.5),
-            margin=dict(l=20, r=20, t=40, b=100),
-            title=f"Distribusi Anggaran per Jenis Belanja<br><sup>Program: {selected_program}</sup>"
+        sub_fig = cached_figure(
+            cube.version,
+            ('sub_detail', selected_region, selected_year, selected_program),
+            lambda: build_sub_detail_pie(sub_summary, selected_program)
         )
         st.plotly_chart(sub_fig, use_container_width=True)
 
-        display_df = sub_summary.copy()
-        display_df['Anggaran'] = display_df['Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
-        display_df['Realisasi'] = display_df['Realisasi'].apply(lambda x: f"Rp {x:,.0f}")
-
-        st.dataframe(
-            display_df.sort_values(by='Anggaran', ascending=False),
-            column_config={
-                "Persentase": st.column_config.ProgressColumn(
-                    "Persentase Realisasi",
-                    format="%.2f%%",
-                    min_value=0,
-                    max_value=100
-                )
-            },
-            use_container_width=True,
-            hide_index=True
+        show_numeric_table(sub_summary, key=('jenis', selected_region, selected_year, selected_program))
+
+# Tabel tetap numerik; format "Rp" dilakukan di browser lewat column_config
+TABLE_COLUMN_CONFIG = {
+    "Anggaran": st.column_config.NumberColumn("Anggaran", format="Rp %,d"),
+    "Realisasi": st.column_config.NumberColumn("Realisasi", format="Rp %,d"),
+    "Persentase": st.column_config.ProgressColumn(
+        "Persentase Realisasi",
+        format="%.2f%%",
+        min_value=0,
+        max_value=100
+    ),
+}
+TABLE_PAGE_SIZE = 50  # baris per halaman; tabel yang lebih panjang dipaginasi di server
+
+
+def show_numeric_table(data, key):
+    """Tabel ringkasan diurutkan dari Anggaran terbesar (angka), dipaginasi bila panjang."""
+    display_df = data.sort_values(by='Anggaran', ascending=False)
+
+    n_pages = max(1, math.ceil(len(display_df) / TABLE_PAGE_SIZE))
+    if n_pages > 1:
+        page = st.number_input(
+            f"Halaman (dari {n_pages})",
+            min_value=1, max_value=n_pages, value=1, step=1,
+            key=f"halaman_{key}"
         )
-
-def show_summary_table(data):
-    st.subheader("🔢 Tabel Ringkasan Program")
-    summary_df = data.groupby('PROGRAM PENGELOLAAN').agg({
-        'Anggaran': 'sum',
-        'Realisasi': 'sum'
-    }).reset_index()
-    summary_df['Persentase'] = np.where(
-        summary_df['Anggaran'] > 0,
-        (summary_df['Realisasi'] / summary_df['Anggaran']) * 100,
-        0
-    )
-    display_df = summary_df.copy()
-    display_df['Anggaran'] = display_df['Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
-    display_df['Realisasi'] = display_df['Realisasi'].apply(lambda x: f"Rp {x:,.0f}")
+        start = (page - 1) * TABLE_PAGE_SIZE
+        display_df = display_df.iloc[start:start + TABLE_PAGE_SIZE]
+        st.caption(f"Baris {start + 1}–{start + len(display_df)} dari {len(data)}")
 
     st.dataframe(
-        display_df.sort_values(by='Anggaran', ascending=False),
-        column_config={
-            "Persentase": st.column_config.ProgressColumn(
-                "Persentase Realisasi",
-                format="%.2f%%",
-                min_value=0,
-                max_value=100
-            )
-        },
+        display_df,
+        column_config=TABLE_COLUMN_CONFIG,
         use_container_width=True,
         hide_index=True
     )
 
-def show_monthly_trend(monthly_data, selected_year, selected_region):
-    st.subheader("📈 Tren Realisasi Bulanan per Program")
-
-    if monthly_data.empty:
-        st.warning("Data realisasi bulanan tidak tersedia")
-        return
-
-    bulan_cols = [col for col in monthly_data.columns if 'REALISASI' in col]
-    bulan_df = monthly_data[
-        (monthly_data['TAHUN'] == selected_year) &
-        (monthly_data['Wilayah'] == selected_region)
-    ].copy()
-
-    if bulan_df.empty:
-        st.warning(f"Tidak ada data bulanan untuk {selected_region} tahun {selected_year}")
-        return
-
-    bulan_df = bulan_df.melt(id_vars=['PROGRAM PENGELOLAAN', 'TAHUN', 'Wilayah'],
-                             value_vars=bulan_cols,
-                             var_name='Bulan',
-                             value_name='Realisasi')
-
-    bulan_df['Bulan'] = bulan_df['Bulan'].str.replace('REALISASI ', '')
-    bulan_order = ['JANUARI', 'FEBRUARI', 'MARET', 'APRIL', 'MEI', 'JUNI',
-                   'JULI', 'AGUSTUS', 'SEPTEMBER', 'OKTOBER', 'NOVEMBER', 'DESEMBER']
-    bulan_df['Bulan'] = pd.Categorical(bulan_df['Bulan'], categories=bulan_order, ordered=True)
-
-    bulan_df = bulan_df.groupby(
-        ['PROGRAM PENGELOLAAN', 'TAHUN', 'Wilayah', 'Bulan'],
-        observed=False
-    ).agg(
-        Realisasi=('Realisasi', 'sum')
-    ).reset_index()
-
-    bulan_df = bulan_df.sort_values('Bulan')
-
-    unique_programs = bulan_df['PROGRAM PENGELOLAAN'].unique()
-
-    if len(unique_programs) == 0:
-        st.warning("Tidak ada data program untuk ditampilkan.")
-        return
-
-    selected_programs = st.multiselect(
-        "Pilih Program untuk Ditampilkan:",
-        options=bulan_df['PROGRAM PENGELOLAAN'].unique(),
-        default=[]
-    )
-
-    if not selected_programs:
-        st.info("Silakan pilih minimal satu program untuk menampilkan grafik.")
-        return
-
-    filtered_df = bulan_df[bulan_df['PROGRAM PENGELOLAAN'].isin(selected_programs)]
+@st.fragment
+@diukur('render_summary_table')
+def show_summary_table(data, selected_year, selected_region):
+    st.subheader("🔢 Tabel Ringkasan Program")
+    # `data` adalah ringkasan per program dari kubus agregat (Persentase sudah ada)
+    show_numeric_table(data, key=('program', selected_region, selected_year))
 
+def build_monthly_trend(filtered_df, selected_year, selected_region):
     trend_fig = px.line(
         filtered_df,
         x='Bulan',
         y='Realisasi',
         color='PROGRAM PENGELOLAAN',
         markers=True,
+        render_mode='webgl',
         title=f"Tren Realisasi Bulanan<br><sup>Wilayah: {selected_region} | Tahun: {selected_year}</sup>",
         height=600
     )
@@ -407,114 +689,288 @@ def show_monthly_trend(monthly_data, selected_year, selected_region):
             x=0.5
         )
     )
+    return trend_fig
+
+def build_program_trend(cube, selected_region, selected_year, selected_programs):
+    bulan_df = cube.monthly_long(selected_region, selected_year)
+    filtered_df = bulan_df[bulan_df['PROGRAM PENGELOLAAN'].isin(selected_programs)]
+    return build_monthly_trend(filtered_df, selected_year, selected_region)
+
+@st.fragment
+@diukur('render_trend')
+def show_monthly_trend(cube, selected_year, selected_region):
+    st.subheader("📈 Tren Realisasi Bulanan per Program")
+
+    # Data bulanan sudah dibentuk (long-format, 12 bulan terurut) saat data dimuat
+    bulan_df = cube.monthly_long(selected_region, selected_year)
+
+    if bulan_df is None:
+        st.warning(f"Tidak ada data bulanan untuk {selected_region} tahun {selected_year}")
+        return
+
+    unique_programs = cube.monthly_programs(selected_region, selected_year)
+
+    if len(unique_programs) == 0:
+        st.warning("Tidak ada data program untuk ditampilkan.")
+        return
+
+    selected_programs = st.multiselect(
+        "Pilih Program untuk Ditampilkan:",
+        options=unique_programs,
+        default=[]
+    )
 
+    if not selected_programs:
+        st.info("Silakan pilih minimal satu program untuk menampilkan grafik.")
+        return
+
+    trend_fig = cached_figure(
+        cube.version,
+        ('trend', selected_region, selected_year, tuple(sorted(selected_programs))),
+        functools.partial(build_program_trend, cube, selected_region, selected_year, selected_programs)
+    )
     st.plotly_chart(trend_fig, use_container_width=True)
 
+    # Pilihan program bertahan saat pindah tahun/wilayah bila daftar programnya sama
+    get_prefetcher().submit(cube.version, [
+        (('trend', region, year, tuple(sorted(selected_programs))),
+         functools.partial(build_program_trend, cube, region, year, selected_programs))
+        for region, year in adjacent_combinations(cube, get_registry().keys, selected_region, selected_year)[::-1]
+        if cube.monthly_programs(region, year) == unique_programs
+    ])
+
+MAX_COMPARE_SERIES = 48  # batas jumlah garis agar browser tetap responsif
+
+
+def build_comparative_trend(series_names, values, title, yaxis_title):
+    """Satu trace WebGL (Scattergl) per seri; `values` berukuran len(series_names) × 12."""
+    fig = go.Figure()
+    for name, row in zip(series_names, values):
+        fig.add_trace(go.Scattergl(
+            x=BULAN,
+            y=row,
+            name=name,
+            mode='lines+markers',
+            line=dict(width=2.5),
+            marker=dict(size=7),
+            hovertemplate="<b>%{x}</b><br>" + name + "<br>Rp%{y:,.0f}<extra></extra>"
+        ))
+    fig.update_layout(
+        title=title,
+        height=550,
+        xaxis_title=None,
+        yaxis_title=yaxis_title,
+        yaxis_tickprefix="Rp ",
+        yaxis_tickformat=",.0f",
+        hovermode="closest",
+        legend=dict(orientation="h", yanchor="bottom", y=-0.35, xanchor="center", x=0.5)
+    )
+    return fig
+
+@st.fragment
+@diukur('render_comparative_trend')
+def show_comparative_trend(cube, selected_year, selected_region):
+    st.subheader("🔀 Perbandingan Tren Antar Tahun & Wilayah")
+    registry = get_registry()
+
+    col1, col2 = st.columns(2)
+    years = col1.multiselect(
+        "Tahun:",
+        options=cube.years,
+        default=[year for year in cube.years if year in (selected_year, selected_year - 1)]
+    )
+    regions = col2.multiselect(
+        "Wilayah:",
+        options=[key for key in registry.keys if key in cube.regions],
+        default=[selected_region],
+        format_func=registry.label
+    )
+    programs = st.multiselect("Program (kosong = semua program):", options=cube.programs, default=[])
+    col3, col4 = st.columns(2)
+    cumulative = col3.radio("Tampilan:", ["Bulanan", "Kumulatif"], horizontal=True) == "Kumulatif"
+    show_yoy = col4.checkbox("Tampilkan selisih terhadap tahun sebelumnya (YoY)")
+
+    series = [(region, year) for region in regions for year in sorted(years)]
+    if not series:
+        st.info("Pilih minimal satu tahun dan satu wilayah.")
+        return
+    if len(series) > MAX_COMPARE_SERIES:
+        st.warning(f"Terlalu banyak kombinasi ({len(series)}); maksimal {MAX_COMPARE_SERIES} garis.")
+        return
+
+    names = [f"{registry.label(region)} {year}" for region, year in series]
+    program_key = tuple(sorted(programs)) or None
+    kind = "Kumulatif" if cumulative else "Bulanan"
+    subtitle = f"<br><sup>Program: {', '.join(programs) if programs else 'Semua'}</sup>"
+
+    fig = cached_figure(
+        cube.version,
+        ('compare', tuple(series), program_key, cumulative),
+        lambda: build_comparative_trend(
+            names, cube.monthly_series(series, program_key, cumulative),
+            f"Realisasi {kind}{subtitle}", f"Realisasi {kind} (Rp)"
+        )
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    if show_yoy:
+        delta = cube.yoy_delta(series, program_key, cumulative)
+        has_previous = ~np.isnan(delta).all(axis=1)
+        if not has_previous.any():
+            st.info("Tidak ada data tahun sebelumnya untuk seri yang dipilih.")
+            return
+        yoy_fig = cached_figure(
+            cube.version,
+            ('compare_yoy', tuple(series), program_key, cumulative),
+            lambda: build_comparative_trend(
+                [f"{name} vs {year - 1}" for name, (_, year), ok in zip(names, series, has_previous) if ok],
+                delta[has_previous],
+                f"Selisih Realisasi {kind} terhadap Tahun Sebelumnya{subtitle}", "Selisih (Rp)"
+            )
+        )
+        st.plotly_chart(yoy_fig, use_container_width=True)
+
+# --- REKONSILIASI GRAND TOTAL ---
+def show_reconciliation(cube, spec, selected_year):
+    """Penanda bila sheet total berbeda dari jumlah sheet wilayah (lihat etl.reconcile_total)."""
+    if spec is None or spec.total is None:
+        return
+    if spec.total == 'derive':
+        st.caption(f"ℹ️ {spec.title} dihitung dari jumlah seluruh sheet wilayah.")
+        return
+
+    report = cube.reconciliation.get(spec.key)
+    if report is None or report.empty:
+        return
+    report = report[report['TAHUN'] == selected_year]
+    if report.empty:
+        return
+
+    st.warning(
+        f"⚠️ Sheet {spec.title} tahun {selected_year} tidak cocok dengan jumlah sheet wilayah: "
+        f"{report['PROGRAM PENGELOLAAN'].nunique()} program, {len(report)} nilai berbeda."
+    )
+    with st.expander("Rincian ketidakcocokan"):
+        st.dataframe(
+            report.drop(columns='TAHUN'),
+            column_config={
+                col: st.column_config.NumberColumn(col, format="Rp %,d")
+                for col in ['Publikasi', 'Turunan', 'Selisih']
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+
+# --- UNDUH DATA ---
+# Berkas unduhan disimpan utuh di memori sesi oleh Streamlit; ekspor yang lebih
+# besar dari ini disiapkan offline (python etl.py menghasilkan artefak Parquet).
+EXPORT_MAX_ROWS = 500_000
+
+
+@st.fragment
+def show_export(df, monthly_data, selected_year, selected_region):
+    with st.expander("⬇️ Unduh Data"):
+        cakupan = st.radio("Cakupan:", ["Filter saat ini", "Seluruh data"], key="ekspor_cakupan")
+        dataset = st.selectbox("Data:", ["Anggaran & Realisasi", "Realisasi Bulanan"], key="ekspor_data")
+        fmt = st.selectbox("Format:", list(EXPORT_FORMATS), key="ekspor_format")
+
+        # Selisih hanya untuk rekonsiliasi sheet total, tidak ikut diunduh
+        frame = df.drop(columns='Selisih', errors='ignore') if dataset == "Anggaran & Realisasi" else monthly_data
+        nama = "realisasi" if dataset == "Anggaran & Realisasi" else "realisasi_bulanan"
+        if cakupan == "Filter saat ini":
+            nama += f"_{selected_region}_{selected_year}".lower().replace(' ', '_')
+        ext, mime, _ = EXPORT_FORMATS[fmt]
+
+        data = frame
+        if cakupan == "Filter saat ini":
+            data = frame[(frame['Wilayah'] == selected_region) & (frame['TAHUN'] == selected_year)]
+        if len(data) > EXPORT_MAX_ROWS:
+            st.caption(f"Data terlalu besar untuk diunduh di sini ({len(data):,} baris); "
+                       f"gunakan filter atau artefak dari `python etl.py`.")
+            return
+
+        def build_file():
+            # Dijalankan hanya saat tombol diklik; hasilnya (bytes) disimpan Streamlit di memori sesi
+            with tempfile.TemporaryFile() as f:
+                with METRICS.timer('export'):
+                    export_frame(data, fmt, f)
+                f.seek(0)
+                return f.read()
+
+        st.download_button(
+            "Unduh",
+            data=build_file,
+            file_name=f"{nama}.{ext}",
+            mime=mime,
+            on_click="ignore",
+            use_container_width=True
+        )
+
 # --- APLIKASI UTAMA (DENGAN SIDEBAR BARU) ---
 def main():
     tampilkan_header()
     # --- JUDUL UTAMA DENGAN ANIMASI ---
-    st.markdown("""
-    <style>
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(-20px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-        .title-box {
-            background: linear-gradient(135deg, #005FAC, #005FAC);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            box-shadow: 0 10px 20px rgba(0,0,0,0.2);
-            text-align: center;
-            margin-bottom: 2rem;
-            animation: fadeIn 1s ease-out;
-        }
-        .title-box h1 {
-            margin-bottom: 0.5rem;
-            font-size: 2.2rem;
-        }
-        .title-box h2 {
-            margin-top: 0;
-            font-size: 1.5rem;
-            opacity: 0.9;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-
     st.markdown("""
     <div class="title-box">
         <h1>Sistem Informasi Realisasi Dana Transfer ke Daerah</h1>
     </div>
     """, unsafe_allow_html=True)
 
-    st.markdown("""
-    <style>
-    .stTabs [data-baseweb="tab-list"] { display: flex; width: 100%; gap: 2px; }
-    .stTabs [data-baseweb="tab"] {
-      flex-grow: 1; text-align: center; height: 50px;
-      white-space: pre-wrap; background-color: #F0F2F6;
-      border-radius: 4px 4px 0px 0px; padding: 10px;
-      font-size: 16px; font-weight: 600;
-      }
-      .stTabs [aria-selected="true"] { background-color: #FFFFFF; }
-        </style>""", unsafe_allow_html=True)
-
 
-    SHEET_URL = "https://docs.google.com/spreadsheets/d/1ayGwiw88EsyAadikJFkdPoDHS5fLbfEcC9YXsgKGm2c/edit?usp=sharing"
-    df, monthly_data = load_and_process_data(SHEET_URL)
+    # Waktu per fase rerun ini (ditampilkan di panel diagnostik)
+    st.session_state['_timings'] = {}
 
-    if df.empty:
-        st.warning("Gagal memuat data. Periksa kembali URL Google Sheet atau koneksi Anda.")
-        st.stop()
+    # Daftar spreadsheet, sheet, dan label wilayah diatur di registry.toml
+    registry = get_registry()
 
     # --- PERUBAHAN UTAMA PADA SIDEBAR ---
     with st.sidebar:
         st.header("🏛️ KPPN Lhokseumawe")
-        # Mapping untuk label wilayah yang akan ditampilkan
-        wilayah_mapping = {
-            'GRAND TOTAL': 'Beranda',
-            'LHOKSEUMAWE': 'Kota Lhokseumawe',
-            'KAB ACEH UTARA': 'Kab. Aceh Utara',
-            'KAB BIREUN': 'Kab. Bireun'
-        }
-
-        # 1. Navigasi Wilayah (bukan dropdown)
-        wilayah_options = sorted(df['Wilayah'].unique())
+        # 1. Navigasi Wilayah (bukan dropdown), urut sesuai registry.
+        #    Daftarnya dari registry, jadi tampil sebelum data wilayah mana pun dimuat.
         selected_region_key = st.radio(
             "Navigasi Utama",  # Label ini akan disembunyikan
-            options=wilayah_options,
-            format_func=lambda x: wilayah_mapping.get(x, x),
+            options=registry.keys,
+            format_func=registry.label,
             label_visibility="collapsed" # Menyembunyikan label "Navigasi Utama"
         )
 
         st.divider() # Garis pemisah visual
 
+    # Hanya wilayah terpilih yang ditunggu; wilayah lain dimuat di latar belakang
+    with fase('load_data'):
+        df, monthly_data, cube = load_and_process_data(selected_region_key)
+
+    if df.empty:
+        st.warning("Gagal memuat data. Periksa kembali URL Google Sheet atau koneksi Anda.")
+        st.stop()
+
+    with st.sidebar:
         # 2. Filter Tahun (dropdown)
         selected_year = st.selectbox(
             "Pilih Tahun:",
-            options=sorted(df['TAHUN'].unique(), reverse=True)
+            options=cube.years
         )
+
+        # 3. Unduh data (filter saat ini atau seluruh data)
+        show_export(df, monthly_data, selected_year, selected_region_key)
     # --- AKHIR PERUBAHAN SIDEBAR ---
-    selected_region_label = wilayah_mapping.get(selected_region_key, selected_region_key)
 
-    filtered_df = df[(df['Wilayah'] == selected_region_key) & (df['TAHUN'] == selected_year)]
+    with fase('filter_aggregate'):
+        totals = cube.totals(selected_region_key, selected_year)
+        program_summary = cube.program_summary(selected_region_key, selected_year)
 
-    if filtered_df.empty:
+    if totals is None:
         st.info("Tidak ada data yang tersedia untuk filter yang Anda pilih.")
         st.stop()
 
-    total_anggaran = filtered_df['Anggaran'].sum()
-    total_realisasi = filtered_df['Realisasi'].sum()
-    persen_total = (total_realisasi / total_anggaran * 100) if total_anggaran > 0 else 0
+    total_anggaran, total_realisasi, persen_total = totals
 
-    if selected_region_key == 'GRAND TOTAL':
-      display_title_region = 'Grand Total'
-    else:
-      display_title_region = selected_region_label
+    display_title_region = registry.title(selected_region_key)
 
     # Gunakan label yang sesuai untuk judul
     st.markdown(f"### ☕ Monitoring Penyaluran Dana Transfer Daerah {display_title_region}")
+    show_reconciliation(cube, registry.get(selected_region_key), selected_year)
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Total Anggaran", f"Rp {total_anggaran:,.0f}")
@@ -522,34 +978,32 @@ def main():
     col3.metric("Persentase Realisasi", f"{persen_total:.1f}%")
     st.markdown("---")
 
-    program_summary = filtered_df.groupby('PROGRAM PENGELOLAAN').agg(
-        Anggaran=('Anggaran', 'sum'),
-        Realisasi=('Realisasi', 'sum')
-    ).reset_index()
-
-    if not program_summary.empty:
-        program_summary['Persentase'] = np.where(
-            program_summary['Anggaran'] > 0,
-            (program_summary['Realisasi'] / program_summary['Anggaran']) * 100,
-            0
-        )
-
     if program_summary.empty:
         st.warning("Tidak ada data program untuk ditampilkan pada filter yang dipilih.")
         st.stop()
 
-    tab1, tab2, tab3 = st.tabs(["💡 Program TKD", "👍 Jenis Belanja", "🏃‍♀️ Tren Bulanan"])
+    tab1, tab2, tab3, tab4 = st.tabs(["💡 Program TKD", "👍 Jenis Belanja", "🏃‍♀️ Tren Bulanan", "🔀 Perbandingan"])
 
     with tab1:
-        show_pie_chart(program_summary)
+        show_pie_chart(program_summary, selected_year, selected_region_key, cube.version)
         st.markdown("---")
-        show_summary_table(program_summary)
+        show_summary_table(program_summary, selected_year, selected_region_key)
 
     with tab2:
-        show_sub_detail_pie(filtered_df, monthly_data, selected_year, selected_region_key)
+        show_sub_detail_pie(cube, selected_year, selected_region_key)
 
     with tab3:
-        show_monthly_trend(monthly_data, selected_year, selected_region_key)
+        show_monthly_trend(cube, selected_year, selected_region_key)
+
+    with tab4:
+        show_comparative_trend(cube, selected_year, selected_region_key)
+
+    # Sementara pengguna membaca, figure untuk tahun/wilayah sebelah disiapkan di latar belakang
+    prefetch_adjacent_views(cube, registry.keys, selected_region_key, selected_year)
+
+    if diagnostik_aktif():
+        show_diagnostics()
+    write_metrics(force=True)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,48 @@
+"""Semantik angka etl.parse_rupiah untuk format teks rupiah dari Google Sheets."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from etl import parse_rupiah  # noqa: E402
+
+# teks -> (nilai float64, nilai int64)
+CASES = [
+    ('Rp1.234.567', 1234567.0, 1234567),
+    ('Rp 1,234,567', 1234567.0, 1234567),
+    ('1234567', 1234567.0, 1234567),
+    ('-Rp 1.000', -1000.0, -1000),
+    ('(1.000)', -1000.0, -1000),
+    ('1.234,56', 1234.56, 1235),
+    ('Rp1.000.000,00', 1000000.0, 1000000),
+    ('1,5', 1.5, 2),
+    ('Rp -', 0.0, 0),
+    ('-', 0.0, 0),
+    ('', 0.0, 0),
+    (None, 0.0, 0),
+    ('abc', 0.0, 0),
+]
+
+
+@pytest.mark.parametrize('text, as_float, as_int', CASES)
+def test_float64(text, as_float, as_int):
+    assert parse_rupiah([text], dtype='float64').tolist() == [pytest.approx(as_float)]
+
+
+@pytest.mark.parametrize('text, as_float, as_int', CASES)
+def test_int64(text, as_float, as_int):
+    result = parse_rupiah([text], dtype='int64')
+    assert str(result.dtype) == 'int64'
+    assert result.tolist() == [as_int]
+
+
+@pytest.mark.parametrize('text, expected', [('12.5', 13), ('13.5', 14), ('12,5', 13), ('-12,5', -13), ('0,49', 0)])
+def test_int64_rounds_half_away_from_zero(text, expected):
+    # Bukan pembulatan ke genap: 12,5 -> 13, bukan 12
+    assert parse_rupiah([text], dtype='int64').tolist() == [expected]
+
+
+def test_fast_and_general_paths_in_one_series():
+    values = ['Rp1.000', '-Rp 1.000', '', 'Rp2.500,50', '(3.000)']
+    assert parse_rupiah(values, dtype='int64').tolist() == [1000, -1000, 0, 2501, -3000]
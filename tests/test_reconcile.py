@@ -0,0 +1,40 @@
+"""Makna kolom Selisih pada rekonsiliasi sheet total (etl.reconcile_total)."""
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from etl import BULAN_COLS, reconcile_total  # noqa: E402
+
+
+def frames(anggaran, realisasi, selisih=None):
+    final = pd.DataFrame({
+        'Jenis Belanja': ['Belanja Modal'], 'PROGRAM PENGELOLAAN': ['DANA DESA'], 'TAHUN': [2024],
+        'Anggaran': [anggaran], 'Realisasi': [realisasi], 'Wilayah': ['GRAND TOTAL'],
+    })
+    if selisih is not None:
+        final['Selisih'] = [selisih]
+    monthly = pd.DataFrame({'PROGRAM PENGELOLAAN': ['DANA DESA'], 'TAHUN': [2024], 'Wilayah': ['GRAND TOTAL'],
+                            **{col: [0] for col in BULAN_COLS}})
+    monthly[BULAN_COLS[0]] = realisasi
+    return final, monthly
+
+
+def test_selisih_is_pagu_minus_realisasi():
+    # Publikasi = turunan dan Selisih = Pagu - Realisasi: tidak ada ketidakcocokan
+    assert reconcile_total(frames(1000, 600, selisih=400), frames(1000, 600)).empty
+
+
+def test_selisih_mismatch_is_reported_as_its_own_measure():
+    report = reconcile_total(frames(1000, 600, selisih=350), frames(1000, 600))
+    assert report[['Ukuran', 'Publikasi', 'Turunan', 'Selisih']].values.tolist() == [['Selisih', 350, 400, -50]]
+
+
+def test_realisasi_mismatch():
+    report = reconcile_total(frames(1000, 650, selisih=350), frames(1000, 600))
+    assert set(report['Ukuran']) == {'Realisasi', 'Realisasi Januari', 'Selisih'}
+
+
+def test_unfilled_selisih_column_is_ignored():
+    assert reconcile_total(frames(1000, 600, selisih=0), frames(1000, 600)).empty
@@ -0,0 +1,154 @@
+"""SnapshotStore dengan sumber CSV lokal: muatan per wilayah, sheet gagal, artefak CLI, pembaruan inkremental."""
+import csv
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import etl  # noqa: E402
+from etl import CURRENT_FILE, REGISTRY_PATH, Metrics, Registry, SheetSpec, SnapshotStore, publish_artifact  # noqa: E402
+
+REGIONS = ['KAB A', 'KAB B']
+TOTAL = 'GRAND TOTAL'
+
+
+def rupiah(value):
+    return f"Rp{value:,}".replace(',', '.')
+
+
+def write_sheet(folder, name, columns, rows):
+    with open(folder / f"{name}.csv", 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows([columns] + rows)
+
+
+def sheet_rows(values, selisih=False):
+    """values: {(program, tahun): (pagu, realisasi januari)}."""
+    rows = []
+    for i, ((program, tahun), (pagu, realisasi)) in enumerate(values.items()):
+        row = [str(i + 1), 'X', '51', 'Belanja Modal', program, str(tahun), rupiah(pagu), rupiah(realisasi)]
+        row += ['Rp0'] * 11 + [rupiah(realisasi), '0%']
+        rows.append(row + ([rupiah(pagu - realisasi)] if selisih else []))
+    return rows
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Folder CSV berisi dua sheet wilayah dan GRAND TOTAL yang sama dengan jumlahnya."""
+    import tomllib
+    with open(REGISTRY_PATH, 'rb') as f:
+        schemas = tomllib.load(f)['schemas']
+    folder = tmp_path / 'sheets'
+    folder.mkdir()
+    values = {
+        'KAB A': {('DANA DESA', 2024): (1000, 600), ('DANA DESA', 2023): (900, 900)},
+        'KAB B': {('DANA DESA', 2024): (500, 100)},
+    }
+    for name in REGIONS:
+        write_sheet(folder, name, schemas['regional'], sheet_rows(values[name]))
+    total = {('DANA DESA', 2024): (1500, 700), ('DANA DESA', 2023): (900, 900)}
+    write_sheet(folder, TOTAL, schemas['grand_total'], sheet_rows(total, selisih=True))
+
+    sheets = [SheetSpec(TOTAL, str(folder), TOTAL, schemas['grand_total'], 'Beranda', 'Grand Total', 'fetch')]
+    sheets += [SheetSpec(name, str(folder), name, schemas['regional'], name, name) for name in REGIONS]
+    return folder, schemas, Registry(sheets)
+
+
+def make_store(registry, folder, fetched=None):
+    def open_source(location):
+        local = etl.open_source(location)
+
+        class Recording:
+            version = local.version
+
+            def fetch(self, names):
+                if fetched is not None:
+                    fetched.append(sorted(names))
+                return local.fetch(names)
+        return Recording()
+    return SnapshotStore(registry, folder=folder, ttl=1e9, open_source=open_source, metrics=Metrics())
+
+
+def test_lazy_load_fetches_only_requested_region(source, tmp_path):
+    _, _, registry = source
+    fetched = []
+    store = make_store(registry, tmp_path / 'snap', fetched)
+    assert store.get() is None and store.needs('KAB A')
+
+    _, _, cube = store.load_regions(['KAB A'])
+    assert fetched == [['KAB A']]
+    assert cube.regions == ['KAB A']
+    assert store.missing_keys == [TOTAL, 'KAB B']
+
+    store.load_regions(store.missing_keys)
+    _, _, cube = store.get()
+    assert sorted(cube.regions) == sorted([TOTAL] + REGIONS)
+    assert cube.totals(TOTAL, 2024) == (1500, 700, pytest.approx(700 / 1500 * 100))
+    # Semua sheet wilayah sudah ada: rekonsiliasi berjalan dan GRAND TOTAL cocok
+    assert cube.reconciliation[TOTAL].empty
+
+
+def test_unparseable_sheet_is_skipped_on_cold_start(source, tmp_path):
+    folder, schemas, registry = source
+    # GRAND TOTAL dengan kolom tambahan tidak cocok skema
+    write_sheet(folder, TOTAL, schemas['grand_total'] + ['EKSTRA'],
+                [row + ['x'] for row in sheet_rows({('DANA DESA', 2024): (1500, 700)}, selisih=True)])
+    store = make_store(registry, tmp_path / 'snap')
+
+    with pytest.raises(ValueError):
+        store.load_regions([TOTAL])
+    assert store.backing_off
+    assert store.load_regions([TOTAL]) is None  # selama jeda: tidak mengunduh ulang
+
+    store._retry_at = 0.0
+    assert not store.needs(TOTAL)
+    _, _, cube = store.load_regions([TOTAL])  # pemuatan penuh, sheet yang gagal dilewati
+    assert sorted(cube.regions) == REGIONS
+    assert cube.totals(TOTAL, 2024) is None
+
+
+def test_dangling_current_pointer(source, tmp_path):
+    folder, _, registry = source
+    snap = tmp_path / 'snap'
+    snap.mkdir()
+    (snap / CURRENT_FILE).write_text('tidak-ada')
+    store = make_store(registry, snap)
+    assert store.get() is None and store.artifact_mode and not store.needs(TOTAL)
+
+    with pytest.raises(ValueError):
+        store.load_regions([TOTAL])
+
+    # Artefak baru diterbitkan CLI: pemuatan berikutnya (setelah jeda) membacanya
+    builder = make_store(registry, tmp_path / 'build')
+    final_data, monthly_data, _ = builder.refresh()
+    publish_artifact(snap, final_data, monthly_data, dict(builder._meta))
+    store._retry_at = 0.0
+    _, _, cube = store.load_regions([TOTAL])
+    assert sorted(cube.regions) == sorted([TOTAL] + REGIONS)
+
+
+def test_incremental_refresh_reparses_changed_sheet_only(source, tmp_path, monkeypatch):
+    folder, schemas, registry = source
+    store = make_store(registry, tmp_path / 'snap')
+    store.refresh()
+
+    parsed = []
+    process_sheet = etl.process_sheet
+    monkeypatch.setattr(etl, 'process_sheet', lambda spec, values: parsed.append(spec.key) or process_sheet(spec, values))
+
+    write_sheet(folder, 'KAB B', schemas['regional'], sheet_rows({('DANA DESA', 2024): (500, 300)}))
+    path = folder / 'KAB B.csv'
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))  # versi sumber berubah
+    _, _, cube = store.refresh()
+
+    assert parsed == ['KAB B']
+    assert cube.totals('KAB B', 2024)[:2] == (500, 300)
+    # GRAND TOTAL tidak diubah: sekarang berbeda 200 dari jumlah wilayah, termasuk Selisih-nya
+    report = cube.reconciliation[TOTAL]
+    assert set(report['Ukuran']) == {'Realisasi', 'Realisasi Januari', 'Selisih'}
+
+    # Setelah restart hasilnya sama (Selisih ikut tersimpan di snapshot)
+    restarted = make_store(registry, tmp_path / 'snap')
+    assert restarted.get()[2].reconciliation[TOTAL].equals(report)